@@ -1,6 +1,8 @@
 import logging
-from typing import List, Dict, Any, Tuple
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 import os
+import threading
 
 from .retriever import DenseRetriever
 from .graph_store import GraphStore
@@ -22,6 +24,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Source files kept in memory for snippet extraction; least recently used are dropped
+_SOURCE_LINES_CACHE_SIZE = 512
+
 class BugLocalization:
     """
     RAG pipeline for bug localization.
@@ -29,7 +34,15 @@ class BugLocalization:
     and uses LLM to select the most likely buggy functions.
     """
     
-    def __init__(self, repo_name: str, repo_path: str):
+    def __init__(self, repo_name: str, repo_path: str, llm_service: Optional[LLMService] = None):
+        """
+        Initialize the pipeline for one repository
+        
+        Args:
+            repo_name: Repository name (owner/repo) whose index is loaded
+            repo_path: Local path of the repository clone
+            llm_service: LLM client to reuse, e.g. across repositories (default: a new one)
+        """
         self.repo_name = repo_name
         self.repo_path = repo_path
         
@@ -46,7 +59,14 @@ class BugLocalization:
         self.graph_store = GraphStore()
         self.graph_store.connect()
         
-        self.llm_service = LLMService()
+        # The LLM client holds no repository state and can be shared
+        self.llm_service = llm_service if llm_service is not None else LLMService()
+        
+        # Source lines of candidate files, keyed by path and validated by mtime/size,
+        # so files shared by many candidates and issues are read once (LRU-bounded)
+        self._source_lines = OrderedDict()
+        # localize() may run in several threads at once
+        self._source_lines_lock = threading.Lock()
         
     def localize(self, issue_title: str, issue_body: str, k: int = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
         """
@@ -58,19 +78,130 @@ class BugLocalization:
             k: Number of candidates to retrieve (defaults to Config.RETRIEVER_TOP_K)
             
         Returns:
-            Tuple[List[Dict], List[Dict], Dict]: (Final Ranked Candidates, Initial Retrieved Candidates, Token Usage)
+            Tuple[List[Dict], List[Dict], Dict]: (Final Ranked Candidates, Initial Retrieved Candidates, Token Usage).
+            Token Usage holds "fallback": True when an LLM call failed and a heuristic
+            query or selection was used instead
         """
         if k is None:
             k = Config.RETRIEVER_TOP_K
             
         logger.info(f"Starting bug localization for: {issue_title}")
         
-        # 1. Process Issue
-        processed_issue = self.issue_processor.process_issue(issue_title, issue_body)
-        
         # 1.5 Generate Smart Search Query
         query_result = self.llm_service.generate_search_query(issue_title, issue_body)
         
+        prepared = self._prepare_selection(issue_title, issue_body, query_result, k)
+        if prepared is None:
+            return [], [], self._query_usage({}, query_result)
+        grouped_candidates, candidates_files, candidates_classes, candidates_funcs, initial_candidates = prepared
+        
+        # 4. LLM Selection (Re-ranking)
+        logger.info(f"Selecting from grouped candidates: {len(candidates_files)}F, {len(candidates_classes)}C, {len(candidates_funcs)}M")
+        
+        try:
+            selected_items, token_usage = self.llm_service.select_functions(issue_title, issue_body, grouped_candidates)
+        except Exception as e:
+            logger.error(f"LLM selection failed: {e}")
+            # Fallback: Flatten and return top mixed
+            flat = candidates_funcs + candidates_classes + candidates_files
+            flat.sort(key=lambda x: x['score'], reverse=True)
+            return flat[:Config.LLM_SELECTION_COUNT], flat, {"fallback": True}
+
+        final_ranked_list = self._rank_selected(selected_items, candidates_files, candidates_classes, candidates_funcs)
+        return final_ranked_list, initial_candidates, self._query_usage(token_usage, query_result)
+
+    @staticmethod
+    def _query_usage(token_usage: Dict[str, Any], query_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Token usage of a result, flagged as fallback when its search query was heuristic"""
+        if query_result.get("fallback"):
+            return {**token_usage, "fallback": True}
+        return token_usage
+
+    def localize_batch(self, issues: List[Tuple[str, str]], k: int = None,
+                       max_concurrency: int = None) -> List[Any]:
+        """
+        Localize several issues of this repository, batching their LLM calls.
+        
+        The search-query prompts of all issues are sent as one batch, candidates are
+        retrieved per issue, and the selection prompts are sent as a second batch.
+        
+        Args:
+            issues: List of (issue_title, issue_body) tuples
+            k: Number of candidates to retrieve (defaults to Config.RETRIEVER_TOP_K)
+            max_concurrency: Maximum number of LLM requests in flight (defaults to all)
+            
+        Returns:
+            List with one localize() result tuple per issue, in input order, or the
+            exception raised while localizing that issue; fallbacks are flagged in
+            token usage as in localize()
+        """
+        if k is None:
+            k = Config.RETRIEVER_TOP_K
+            
+        logger.info(f"Starting batched bug localization for {len(issues)} issues")
+        try:
+            query_results = self.llm_service.generate_search_queries(issues, max_concurrency=max_concurrency)
+        except Exception as e:
+            # One failing batch must not fail every issue; localize them one by one instead
+            logger.error(f"Batched search query generation failed, localizing issues individually: {e}")
+            results = []
+            for issue_title, issue_body in issues:
+                try:
+                    results.append(self.localize(issue_title, issue_body, k))
+                except Exception as issue_error:
+                    results.append(issue_error)
+            return results
+
+        prepared = []
+        for (issue_title, issue_body), query_result in zip(issues, query_results):
+            try:
+                prepared.append(self._prepare_selection(issue_title, issue_body, query_result, k))
+            except Exception as e:
+                prepared.append(e)
+        
+        requests = [
+            (issue_title, issue_body, p[0])
+            for (issue_title, issue_body), p in zip(issues, prepared)
+            if p is not None and not isinstance(p, Exception)
+        ]
+        selections = iter(self.llm_service.select_functions_batch(requests, max_concurrency=max_concurrency))
+        
+        results = []
+        for p, query_result in zip(prepared, query_results):
+            if p is None:
+                results.append(([], [], self._query_usage({}, query_result)))
+                continue
+            if isinstance(p, Exception):
+                results.append(p)
+                continue
+                
+            grouped_candidates, candidates_files, candidates_classes, candidates_funcs, initial_candidates = p
+            selection = next(selections)
+            if isinstance(selection, Exception):
+                logger.error(f"LLM selection failed: {selection}")
+                # Fallback: Flatten and return top mixed
+                flat = candidates_funcs + candidates_classes + candidates_files
+                flat.sort(key=lambda x: x['score'], reverse=True)
+                results.append((flat[:Config.LLM_SELECTION_COUNT], flat, {"fallback": True}))
+                continue
+                
+            selected_items, token_usage = selection
+            final_ranked_list = self._rank_selected(selected_items, candidates_files, candidates_classes, candidates_funcs)
+            results.append((final_ranked_list, initial_candidates, self._query_usage(token_usage, query_result)))
+            
+        return results
+
+    def _prepare_selection(self, issue_title: str, issue_body: str, query_result: Dict[str, Any], k: int):
+        """
+        Retrieve, filter and enrich the candidates the LLM selects from.
+        
+        Returns:
+            Tuple of (grouped candidates, files, classes, functions, initial candidates),
+            or None when nothing was retrieved
+        """
+        # 1. Process Issue
+        processed_issue = self.issue_processor.process_issue(issue_title, issue_body)
+        
         search_query = query_result.get("query", issue_title)
         is_test_related = query_result.get("is_test_related", False)
         
@@ -86,7 +217,7 @@ class BugLocalization:
         
         if not retrieval_results:
             logger.warning("No candidates retrieved.")
-            return [], [], {}
+            return None
 
         # 2.5 Filter Test Files if irrelevant
         if not is_test_related:
@@ -237,19 +368,10 @@ class BugLocalization:
             'classes': candidates_classes[:Config.LLM_INPUT_LIMIT],
             'functions': candidates_funcs[:Config.LLM_INPUT_LIMIT]
         }
-        
-        # 4. LLM Selection (Re-ranking)
-        logger.info(f"Selecting from grouped candidates: {len(candidates_files)}F, {len(candidates_classes)}C, {len(candidates_funcs)}M")
-        
-        try:
-            selected_items, token_usage = self.llm_service.select_functions(issue_title, issue_body, grouped_candidates)
-        except Exception as e:
-            logger.error(f"LLM selection failed: {e}")
-            # Fallback: Flatten and return top mixed
-            flat = candidates_funcs + candidates_classes + candidates_files
-            flat.sort(key=lambda x: x['score'], reverse=True)
-            return flat[:Config.LLM_SELECTION_COUNT], flat, {}
+        return grouped_candidates, candidates_files, candidates_classes, candidates_funcs, initial_candidates
 
+    def _rank_selected(self, selected_items, candidates_files, candidates_classes, candidates_funcs) -> List[Dict[str, Any]]:
+        """Order the LLM-selected candidates first, followed by the remaining functions by score"""
         # Construct Final Ranked List
         # selected_items is a list of dicts with 'entity_type' and 'id'
         final_ranked_list = []
@@ -275,7 +397,7 @@ class BugLocalization:
             if cand['id'] not in selected_ids:
                 final_ranked_list.append(cand)
                 
-        return final_ranked_list, initial_candidates, token_usage
+        return final_ranked_list
 
     def _create_candidate_from_node(self, node_data, entity_type, file_path):
         """Helper to create a candidate dict from a Neo4j node dict."""
@@ -296,16 +418,13 @@ class BugLocalization:
             # Read Code
             code_content = ""
             if file_path:
-                full_path = os.path.join(self.repo_path, file_path)
-                if os.path.exists(full_path):
-                    with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        if entity_type == 'file':
-                            code_content = f.read()
-                        else:
-                            lines = f.readlines()
-                            start = max(0, cand['start_line'] - 1)
-                            end = min(len(lines), cand['end_line'])
-                            code_content = "".join(lines[start:end])
+                lines = self._read_source_lines(file_path)
+                if entity_type == 'file':
+                    code_content = "".join(lines)
+                else:
+                    start = max(0, cand['start_line'] - 1)
+                    end = min(len(lines), cand['end_line'])
+                    code_content = "".join(lines[start:end])
             
             if not code_content:
                 code_content = cand['signature'] or "Code not available"
@@ -316,6 +435,30 @@ class BugLocalization:
             logger.warning(f"Error hydrating candidate {node_data.get('id')}: {e}")
             return None
 
+    def _read_source_lines(self, file_path: str) -> List[str]:
+        """Lines of a repository file (empty if missing), re-read only when the file changed."""
+        full_path = os.path.join(self.repo_path, file_path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return []
+        
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._source_lines_lock:
+            cached = self._source_lines.get(file_path)
+            if cached and cached[0] == version:
+                self._source_lines.move_to_end(file_path)
+                return cached[1]
+        
+        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+        with self._source_lines_lock:
+            self._source_lines[file_path] = (version, lines)
+            self._source_lines.move_to_end(file_path)
+            if len(self._source_lines) > _SOURCE_LINES_CACHE_SIZE:
+                self._source_lines.popitem(last=False)
+        return lines
+
     def _enrich_candidates(self, retrieval_results) -> List[Dict[str, Any]]:
         """Enrich retrieval results with code and graph context."""
         candidates = []
@@ -340,16 +483,13 @@ class BugLocalization:
             # Try to read from file first, fallback to snippet from vector store
             code_content = ""
             try:
-                full_path = os.path.join(self.repo_path, res.file_path)
-                if os.path.exists(full_path):
-                    with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        if res.entity_type == 'file':
-                             code_content = f.read() # Read whole file for 'file' type
-                        else:
-                            lines = f.readlines()
-                            start = max(0, res.start_line - 1)
-                            end = min(len(lines), res.end_line)
-                            code_content = "".join(lines[start:end])
+                lines = self._read_source_lines(res.file_path)
+                if res.entity_type == 'file':
+                     code_content = "".join(lines) # Read whole file for 'file' type
+                else:
+                    start = max(0, res.start_line - 1)
+                    end = min(len(lines), res.end_line)
+                    code_content = "".join(lines[start:end])
             except Exception as e:
                 logger.warning(f"Could not read code for {res.name}: {e}")
             
@@ -553,13 +553,15 @@ class IncrementalIndexer:
             logger.error(f"Failed to update metadata: {e}", exc_info=True)
             return False
     
-    def update_index(self, old_commit: str, new_commit: str) -> UpdateResult:
+    def update_index(self, old_commit: str, new_commit: str,
+                     changed_files: Optional[Tuple[List[str], List[str], List[str]]] = None) -> UpdateResult:
         """
         Incrementally update index from old to new commit
         
         Args:
             old_commit: Old commit SHA
             new_commit: New commit SHA
+            changed_files: Precomputed (added, modified, deleted) files (optional, diffed here if omitted)
             
         Returns:
             UpdateResult with statistics
@@ -570,7 +572,10 @@ class IncrementalIndexer:
             logger.info(f"Starting incremental update: {old_commit[:7]} → {new_commit[:7]}")
             
             # Get changed files
-            added, modified, deleted = self.get_changed_files(old_commit, new_commit)
+            if changed_files is not None:
+                added, modified, deleted = changed_files
+            else:
+                added, modified, deleted = self.get_changed_files(old_commit, new_commit)
             
             if not added and not modified and not deleted:
                 logger.info("No supported files changed")
@@ -586,23 +591,10 @@ class IncrementalIndexer:
             
             # Classify changes
             changes = self.classify_changes(added, modified, deleted)
+            # Whether the change set is small enough for an incremental update is
+            # decided by the caller (decide_update_strategy weighs changed bytes)
             total_changed = len(changes['to_reindex']) + len(changes['to_remove'])
             
-            # Check if too many files changed (signal for full reindex)
-            if total_changed > 50:
-                logger.warning(f"Too many files changed ({total_changed}), signaling full reindex needed")
-                return UpdateResult(
-                    repo_name=self.repo_name,
-                    old_commit=old_commit,
-                    new_commit=new_commit,
-                    files_changed=total_changed,
-                    functions_updated=0,
-                    windows_updated=0,
-                    update_time_seconds=time.time() - start_time,
-                    success=False,
-                    error_msg=f"Too many files changed ({total_changed} > 50), full reindex recommended"
-                )
-            
             # Process deleted files
             removed_ids_from_deleted = self.process_deleted_files(deleted)
             
@@ -3,6 +3,7 @@ LLM Service - Interface for Large Language Model interactions
 Uses Google's Gemini models for code analysis and patch generation
 """
 
+import functools
 import logging
 import os
 from typing import Dict, Any, Optional, List
@@ -231,54 +232,12 @@ Generate a concise solution plan.
 
 
 
-    @retry_with_backoff
-    def select_functions(self, issue_title: str, issue_body: str, candidates: Any) -> List[Dict[str, Any]]:
-        """
-        Select the exact buggy code entities (classes/functions) from a list of candidates.
-        
-        Args:
-            issue_title: Issue title
-            issue_body: Issue body
-            candidates: List of candidate dicts OR Dict with keys 'files', 'classes', 'functions'
-            
-        Returns:
-            Tuple of (List of selected candidate dicts with 'reasoning' and 'entity_type', token_usage)
-        """
-        if not self.is_available() or not candidates:
-            return [], {} # Fallback
-
-        try:
-            # Handle input format
-            if isinstance(candidates, list):
-                # Legacy/Fallback mode
-                files = [c for c in candidates if c.get('entity_type') == 'file']
-                classes = [c for c in candidates if c.get('entity_type') == 'class']
-                funcs = [c for c in candidates if c.get('entity_type') == 'function']
-            else:
-                files = candidates.get('files', [])
-                classes = candidates.get('classes', [])
-                funcs = candidates.get('functions', [])
-
-            logger.info(f"LLM Input Candidates: {len(files)} Files, {len(classes)} Classes, {len(funcs)} Functions")
-            
-            # Helper to format a single candidate
-            def format_cand(cand, idx, label):
-                raw_code = cand.get('code', '')
-                optimized_code = self._optimize_token_usage(raw_code)
-                code_snippet = optimized_code[:1500] 
-                
-                type_label = cand.get('entity_type', 'unknown').upper()
-                class_info = f"Class: {cand.get('class_name')}\n" if cand.get('class_name') and cand.get('entity_type') == 'function' else ""
-                
-                return f"[{label} Candidate {idx}] (ID: {cand.get('id')}):\nType: {type_label}\nFile: {cand.get('file_path')}\n{class_info}Name: {cand.get('name')}\nCode:\n```\n{code_snippet}\n```\n\n"
-
-            # Build Prompt Sections
-            files_text = "\n".join([format_cand(c, i, "FILE") for i, c in enumerate(files)])
-            classes_text = "\n".join([format_cand(c, i, "CLASS") for i, c in enumerate(classes)])
-            funcs_text = "\n".join([format_cand(c, i, "FUNC") for i, c in enumerate(funcs)])
-
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", f"""You are an expert software engineer debugging a complex system.
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _selection_prompt() -> ChatPromptTemplate:
+        """Prompt template for select_functions / select_functions_batch (built once)"""
+        return ChatPromptTemplate.from_messages([
+            ("system", f"""You are an expert software engineer debugging a complex system.
 Your task is to identify the **ROOT CAUSE** code entities (files, classes, or functions) that need to be modified to fix the bug.
 
 **CRITICAL INSTRUCTIONS**:
@@ -301,7 +260,7 @@ Example:
   "selected_classes": [],
   "selected_functions": [ {{{{ "id": "func_a", "reasoning": "Off-by-one error" }}}} ]
 }}}}"""),
-                ("human", """Issue: {title}
+            ("human", """Issue: {title}
 Description: {body}
 
 === CANDIDATE FILES ===
@@ -314,81 +273,200 @@ Description: {body}
 {funcs_text}
 
 Select the buggy entities.""")
-            ])
+        ])
+
+    @staticmethod
+    def _split_candidates(candidates: Any):
+        """Return (files, classes, funcs) from a candidate list or grouped dict"""
+        # Handle input format
+        if isinstance(candidates, list):
+            # Legacy/Fallback mode
+            files = [c for c in candidates if c.get('entity_type') == 'file']
+            classes = [c for c in candidates if c.get('entity_type') == 'class']
+            funcs = [c for c in candidates if c.get('entity_type') == 'function']
+        else:
+            files = candidates.get('files', [])
+            classes = candidates.get('classes', [])
+            funcs = candidates.get('functions', [])
+        return files, classes, funcs
+
+    def _selection_inputs(self, issue_title: str, issue_body: str, files, classes, funcs) -> Dict[str, Any]:
+        """Build the selection prompt variables for one issue"""
+        logger.info(f"LLM Input Candidates: {len(files)} Files, {len(classes)} Classes, {len(funcs)} Functions")
+        
+        # Helper to format a single candidate
+        def format_cand(cand, idx, label):
+            raw_code = cand.get('code', '')
+            optimized_code = self._optimize_token_usage(raw_code)
+            code_snippet = optimized_code[:1500] 
             
-            chain = prompt | self.llm
-            response = chain.invoke({
-                "title": issue_title,
-                "body": issue_body,
-                "files_text": files_text,
-                "classes_text": classes_text,
-                "funcs_text": funcs_text
-            })
+            type_label = cand.get('entity_type', 'unknown').upper()
+            class_info = f"Class: {cand.get('class_name')}\n" if cand.get('class_name') and cand.get('entity_type') == 'function' else ""
             
-            content = response.content
-            logger.info(f"Raw LLM Response: {content}")
+            return f"[{label} Candidate {idx}] (ID: {cand.get('id')}):\nType: {type_label}\nFile: {cand.get('file_path')}\n{class_info}Name: {cand.get('name')}\nCode:\n```\n{code_snippet}\n```\n\n"
+
+        # Build Prompt Sections
+        files_text = "\n".join([format_cand(c, i, "FILE") for i, c in enumerate(files)])
+        classes_text = "\n".join([format_cand(c, i, "CLASS") for i, c in enumerate(classes)])
+        funcs_text = "\n".join([format_cand(c, i, "FUNC") for i, c in enumerate(funcs)])
+
+        return {
+            "title": issue_title,
+            "body": issue_body,
+            "files_text": files_text,
+            "classes_text": classes_text,
+            "funcs_text": funcs_text
+        }
+
+    def _parse_selection(self, response, files, classes, funcs):
+        """Map an LLM selection response back to candidates; returns (selected, token_usage)"""
+        content = response.content
+        logger.info(f"Raw LLM Response: {content}")
+        
+        # Cleanup markdown
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0]
+        elif "```" in content:
+            content = content.split("```")[1].split("```")[0]
             
-            # Cleanup markdown
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
+        import json
+        result = json.loads(content)
+        
+        selected_candidates = []
+        
+        # Helper to map back
+        all_source_map = {c['id']: c for c in files + classes + funcs}
+        
+        # Aggregate in priority order: Functions > Classes > Files
+        for category in ["selected_functions", "selected_classes", "selected_files"]:
+            items = result.get(category, [])
+            for item in items:
+                cand_id = item.get('id')
+                if not cand_id: continue
                 
-            import json
-            result = json.loads(content)
-            
-            selected_candidates = []
-            
-            # Helper to map back
-            all_source_map = {c['id']: c for c in files + classes + funcs}
-            
-            # Aggregate in priority order: Functions > Classes > Files
-            for category in ["selected_functions", "selected_classes", "selected_files"]:
-                items = result.get(category, [])
-                for item in items:
-                    cand_id = item.get('id')
-                    if not cand_id: continue
-                    
-                    orig_cand = all_source_map.get(cand_id)
-                    if orig_cand:
-                        new_cand = orig_cand.copy()
-                        new_cand['llm_reasoning'] = item.get('reasoning')
-                        # Ensure entity type is correct based on category bucket? 
-                        # Or trust original. Trust original.
-                        selected_candidates.append(new_cand)
-
-            # Limit total selection count? Or just return all relevant.
-            # config.LLM_SELECTION_COUNT applies to total items usually.
+                orig_cand = all_source_map.get(cand_id)
+                if orig_cand:
+                    new_cand = orig_cand.copy()
+                    new_cand['llm_reasoning'] = item.get('reasoning')
+                    # Ensure entity type is correct based on category bucket? 
+                    # Or trust original. Trust original.
+                    selected_candidates.append(new_cand)
+
+        # Limit total selection count? Or just return all relevant.
+        # config.LLM_SELECTION_COUNT applies to total items usually.
+        
+        # Sort by priority? The prompt asked for granular. 
+        # We just return the list; the caller sorts/ranks.
+        
+        # Extract token usage
+        token_usage = {}
+        if hasattr(response, 'response_metadata'):
+            token_usage = response.response_metadata.get('token_usage', {})
+        
+        return selected_candidates, token_usage
+
+    @retry_with_backoff
+    def select_functions(self, issue_title: str, issue_body: str, candidates: Any) -> List[Dict[str, Any]]:
+        """
+        Select the exact buggy code entities (classes/functions) from a list of candidates.
+        
+        Args:
+            issue_title: Issue title
+            issue_body: Issue body
+            candidates: List of candidate dicts OR Dict with keys 'files', 'classes', 'functions'
             
-            # Sort by priority? The prompt asked for granular. 
-            # We just return the list; the caller sorts/ranks.
+        Returns:
+            Tuple of (List of selected candidate dicts with 'reasoning' and 'entity_type', token_usage);
+            token_usage is {"fallback": True} when no LLM selection was made
+        """
+        if not candidates:
+            return [], {}
+        if not self.is_available():
+            return [], {"fallback": True}
+
+        files, classes, funcs = [], [], []
+        try:
+            files, classes, funcs = self._split_candidates(candidates)
+            inputs = self._selection_inputs(issue_title, issue_body, files, classes, funcs)
             
-            # Extract token usage
-            token_usage = {}
-            if hasattr(response, 'response_metadata'):
-                token_usage = response.response_metadata.get('token_usage', {})
+            chain = self._selection_prompt() | self.llm
+            response = chain.invoke(inputs)
             
-            return selected_candidates, token_usage
+            return self._parse_selection(response, files, classes, funcs)
 
         except Exception as e:
             if "429" in str(e) or "quota" in str(e).lower() or "rate limit" in str(e).lower():
                 raise
             logger.error(f"Error selecting functions: {e}")
             # Fallback
-            flat_candidates = (files if 'files' in locals() else []) + (classes if 'classes' in locals() else []) + (funcs if 'funcs' in locals() else [])
-            return flat_candidates[:1], {} 
+            return (files + classes + funcs)[:1], {"fallback": True}
 
-    @retry_with_backoff
-    def generate_search_query(self, issue_title: str, issue_body: str) -> Dict[str, Any]:
+    def select_functions_batch(self, requests: List[tuple], max_concurrency: Optional[int] = None) -> List[Any]:
         """
-        Generate a search query and determines if the issue is related to test files.
+        Select buggy entities for several issues, sending all prompts as one LLM batch.
+        
+        Prompts that fail in the batch (e.g. rate limits) are retried one by one
+        through select_functions.
+        
+        Args:
+            requests: List of (issue_title, issue_body, candidates) tuples
+            max_concurrency: Maximum number of prompts in flight (defaults to all)
+            
+        Returns:
+            List of (selected candidates, token_usage) tuples in request order, or the
+            exception raised for a request whose selection failed; token_usage is
+            {"fallback": True} when no LLM selection was made
         """
+        results = [([], {}) for _ in requests]
         if not self.is_available():
-            return {"query": f"{issue_title} {issue_body}"[:200], "is_test_related": True}
+            return [([], {"fallback": True} if candidates else {}) for _, _, candidates in requests]
 
-        try:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are an expert developer.
+        pending = []
+        for i, (issue_title, issue_body, candidates) in enumerate(requests):
+            if not candidates:
+                continue
+            files, classes, funcs = [], [], []
+            try:
+                files, classes, funcs = self._split_candidates(candidates)
+                inputs = self._selection_inputs(issue_title, issue_body, files, classes, funcs)
+            except Exception as e:
+                logger.error(f"Error selecting functions: {e}")
+                results[i] = ((files + classes + funcs)[:1], {"fallback": True})
+                continue
+            pending.append((i, files, classes, funcs, inputs))
+
+        if not pending:
+            return results
+
+        chain = self._selection_prompt() | self.llm
+        responses = chain.batch(
+            [inputs for _, _, _, _, inputs in pending],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        
+        for (i, files, classes, funcs, _), response in zip(pending, responses):
+            if isinstance(response, Exception):
+                logger.warning(f"Batched selection failed, retrying individually: {response}")
+                try:
+                    results[i] = self.select_functions(*requests[i])
+                except Exception as e:
+                    results[i] = e
+                continue
+            try:
+                results[i] = self._parse_selection(response, files, classes, funcs)
+            except Exception as e:
+                logger.error(f"Error selecting functions: {e}")
+                results[i] = ((files + classes + funcs)[:1], {"fallback": True})
+        
+        return results
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _search_query_prompt() -> ChatPromptTemplate:
+        """Prompt template for generate_search_query / generate_search_queries (built once)"""
+        return ChatPromptTemplate.from_messages([
+            ("system", """You are an expert developer.
 Target:
 1. Generate a concise search query (5-10 keywords) to find the relevant code.
 2. **Predict specific Class Names** or File Names that are likely to be relevant based on the issue description.
@@ -401,35 +479,80 @@ Return a JSON object:
   "is_test_related": boolean
 }}
 """),
-                ("human", "Issue: {title}\nDescription: {body}\n\nOutput JSON:")
-            ])
-            
-            chain = prompt | self.llm
+            ("human", "Issue: {title}\nDescription: {body}\n\nOutput JSON:")
+        ])
+
+    @staticmethod
+    def _parse_search_query(response, issue_title: str) -> Dict[str, Any]:
+        """Turn the LLM JSON answer into a search query and test-relatedness flag"""
+        content = response.content.strip()
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0]
+        elif "```" in content:
+            content = content.split("```")[1].split("```")[0]
+        
+        import json
+        result = json.loads(content)
+        
+        base_query = result.get("query", f"{issue_title}")
+        class_names = result.get("potential_class_names", "")
+        
+        # Enrich query with class names if available
+        final_query = f"{base_query} {class_names}".strip()
+        
+        return {
+            "query": final_query,
+            "is_test_related": result.get("is_test_related", False)
+        }
+
+    @retry_with_backoff
+    def generate_search_query(self, issue_title: str, issue_body: str) -> Dict[str, Any]:
+        """
+        Generate a search query and determines if the issue is related to test files.
+        
+        Heuristic queries used when the LLM is unavailable or fails carry "fallback": True.
+        """
+        if not self.is_available():
+            return {"query": f"{issue_title} {issue_body}"[:200], "is_test_related": True, "fallback": True}
+
+        try:
+            chain = self._search_query_prompt() | self.llm
             response = chain.invoke({"title": issue_title, "body": issue_body})
             
-            content = response.content.strip()
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            import json
-            result = json.loads(content)
-            
-            base_query = result.get("query", f"{issue_title}")
-            class_names = result.get("potential_class_names", "")
-            
-            # Enrich query with class names if available
-            final_query = f"{base_query} {class_names}".strip()
-            
-            return {
-                "query": final_query,
-                "is_test_related": result.get("is_test_related", False)
-            }
+            return self._parse_search_query(response, issue_title)
 
         except Exception as e:
             logger.error(f"Error generating search query: {e}")
-            return {"query": f"{issue_title}", "is_test_related": True}
+            return {"query": f"{issue_title}", "is_test_related": True, "fallback": True}
+
+    def generate_search_queries(self, issues: List[tuple], max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Generate search queries for several (issue_title, issue_body) pairs as one LLM batch.
+        
+        Prompts that fail in the batch are retried one by one through generate_search_query.
+        """
+        if not self.is_available():
+            return [self.generate_search_query(title, body) for title, body in issues]
+
+        chain = self._search_query_prompt() | self.llm
+        responses = chain.batch(
+            [{"title": title, "body": body} for title, body in issues],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        
+        results = []
+        for (title, body), response in zip(issues, responses):
+            if isinstance(response, Exception):
+                logger.warning(f"Batched search query failed, retrying individually: {response}")
+                results.append(self.generate_search_query(title, body))
+                continue
+            try:
+                results.append(self._parse_search_query(response, title))
+            except Exception as e:
+                logger.error(f"Error generating search query: {e}")
+                results.append({"query": f"{title}", "is_test_related": True, "fallback": True})
+        return results
 
     @retry_with_backoff
     def generate_candidate_analysis(self, issue_title: str, issue_body: str, candidates: List[Dict[str, Any]]) -> str:
@@ -2,6 +2,7 @@
 Dense retriever - performs similarity search using FAISS
 """
 
+import heapq
 import logging
 import numpy as np
 from pathlib import Path
@@ -172,8 +173,7 @@ class DenseRetriever:
                     
                 file_scores[file_path] = max(file_scores[file_path], current_score)
                 
-        # Sort by score
-        sorted_files = sorted(file_scores.items(), key=lambda x: x[1], reverse=True)
+        # Top k paths by score; only the k best are ordered (same result and tie order as a full sort)
+        top_files = heapq.nlargest(k, file_scores.items(), key=lambda x: x[1])
         
-        # Return top k paths
-        return [f[0] for f in sorted_files[:k]]
+        return [f[0] for f in top_files]
@@ -21,7 +21,7 @@ class UpdateConfig:
     alert_on_failure: bool = False
     
     # Thresholds
-    max_files_for_incremental: int = 50
+    max_bytes_for_incremental: int = 5_000_000
     update_timeout_seconds: int = 300
     max_retries: int = 2
     
@@ -84,7 +84,7 @@ class UpdateConfig:
             alert_on_failure=get_bool('ALERT_ON_FAILURE', False),
             
             # Thresholds
-            max_files_for_incremental=get_int('MAX_FILES_FOR_INCREMENTAL', 50),
+            max_bytes_for_incremental=get_int('MAX_BYTES_FOR_INCREMENTAL', 5_000_000),
             update_timeout_seconds=get_int('UPDATE_TIMEOUT_SECONDS', 300),
             max_retries=get_int('MAX_RETRIES', 2),
             
@@ -110,6 +110,12 @@ class UpdateConfig:
             neo4j_password=get_str('NEO4J_PASSWORD', 'password')
         )
         
+        if os.getenv('MAX_FILES_FOR_INCREMENTAL') is not None:
+            logger.warning(
+                "MAX_FILES_FOR_INCREMENTAL is no longer used; "
+                "set MAX_BYTES_FOR_INCREMENTAL to limit incremental updates"
+            )
+        
         logger.info("Loaded configuration from environment variables")
         return config
     
@@ -123,8 +129,8 @@ class UpdateConfig:
         valid = True
         
         # Validate thresholds
-        if self.max_files_for_incremental <= 0:
-            logger.error(f"Invalid max_files_for_incremental: {self.max_files_for_incremental}")
+        if self.max_bytes_for_incremental <= 0:
+            logger.error(f"Invalid max_bytes_for_incremental: {self.max_bytes_for_incremental}")
             valid = False
         
         if self.update_timeout_seconds <= 0:
@@ -177,7 +183,7 @@ class UpdateConfig:
             'auto_clone_repos': self.auto_clone_repos,
             'log_all_updates': self.log_all_updates,
             'alert_on_failure': self.alert_on_failure,
-            'max_files_for_incremental': self.max_files_for_incremental,
+            'max_bytes_for_incremental': self.max_bytes_for_incremental,
             'update_timeout_seconds': self.update_timeout_seconds,
             'max_retries': self.max_retries,
             'repo_storage_path': self.repo_storage_path,
@@ -3,9 +3,11 @@ from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
-def process_installation_event(repo_full_name, repo_default_branch, action):
+def process_installation_event(repo_full_name, repo_default_branch, action, repo_path=None):
     """
     Process installation events (created/added) in background.
+    
+    repo_path may point at a repository already synced by sync_installation_repositories.
     """
     try:
         logger.info(f"Processing installation '{action}' for {repo_full_name}")
@@ -25,7 +27,7 @@ def process_installation_event(repo_full_name, repo_default_branch, action):
                 'ref': f"refs/heads/{repo_default_branch}",
                 'forced': False
             }
-            process_push_event(repo_full_name, push_payload)
+            process_push_event(repo_full_name, push_payload, repo_path=repo_path)
             
         elif action == 'deleted':
             # 1. Delete Neo4j data
@@ -66,3 +68,20 @@ def process_installation_event(repo_full_name, repo_default_branch, action):
 
     except Exception as e:
         logger.error(f"Failed to process installation event for {repo_full_name}: {e}", exc_info=True)
+
+
+def sync_installation_repositories(repos):
+    """
+    Clone/update all repositories of an installation event concurrently.
+    
+    repos is a list of (repo_full_name, default_branch) pairs. Returns a dict
+    mapping repository name to local path for the repositories that synced;
+    the others are synced again (with retries) by process_installation_event.
+    """
+    from GitHub_Event_Handler.processPushEvents import sync_repositories
+    
+    try:
+        return sync_repositories([(repo_full_name, None) for repo_full_name, _ in repos])
+    except Exception as e:
+        logger.error(f"Failed to sync installation repositories: {e}", exc_info=True)
+        return {}
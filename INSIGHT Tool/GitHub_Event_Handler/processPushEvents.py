@@ -4,7 +4,7 @@ Process GitHub push events for incremental knowledge base updates
 
 import logging
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -24,15 +24,36 @@ if not config.validate():
 # Initialize metrics tracker
 metrics_tracker = UpdateMetrics(config.metrics_storage_path)
 
+# Shared repository sync manager (keeps per-repository git handles warm across events)
+repository_sync = RepositorySync(config.repo_storage_path)
 
+# Branches whose pushes trigger knowledge base updates
+DEFAULT_BRANCHES = frozenset({'main', 'master'})
 
-def process_push_event(repo_full_name: str, push_payload: Dict[str, Any]) -> Dict[str, Any]:
+
+def is_default_branch_ref(ref: str) -> bool:
+    """
+    Check whether a git ref points at one of the tracked default branches
+    
+    Args:
+        ref: Full git ref (e.g., "refs/heads/main")
+        
+    Returns:
+        True if the last ref component is a tracked default branch
+    """
+    return ref.rsplit('/', 1)[-1] in DEFAULT_BRANCHES
+
+
+
+def process_push_event(repo_full_name: str, push_payload: Dict[str, Any],
+                       repo_path: Optional[str] = None) -> Dict[str, Any]:
     """
     Process a GitHub push event and update the knowledge base
     
     Args:
         repo_full_name: Full repository name (owner/repo)
         push_payload: GitHub push event payload
+        repo_path: Local path of an already synced repository (optional, synced here if omitted)
         
     Returns:
         Dictionary with update results
@@ -49,7 +70,7 @@ def process_push_event(repo_full_name: str, push_payload: Dict[str, Any]) -> Dic
         ref = push_payload.get('ref', '')
         
         # Validate branch (should already be filtered, but double-check)
-        if not (ref.endswith('/main') or ref.endswith('/master')):
+        if not is_default_branch_ref(ref):
             logger.info(f"Skipping push to non-main branch: {ref}")
             return {
                 'success': True,
@@ -60,7 +81,8 @@ def process_push_event(repo_full_name: str, push_payload: Dict[str, Any]) -> Dic
         
         # Get or sync repository
         # If after_commit is None (e.g. from installation event), sync to latest
-        repo_path = get_or_sync_repository(repo_full_name, after_commit)
+        if not repo_path:
+            repo_path = get_or_sync_repository(repo_full_name, after_commit)
         
         # If after_commit was None, get the actual SHA we synced to
         if not after_commit:
@@ -162,8 +184,7 @@ def get_or_sync_repository(repo_full_name: str, commit_sha: str) -> str:
         RepositorySyncError: If sync fails
     """
     try:
-        sync = RepositorySync(config.repo_storage_path)
-        repo_path = sync.sync_repository(
+        repo_path = repository_sync.sync_repository(
             repo_full_name, 
             commit_sha,
             max_retries=config.max_retries
@@ -176,6 +197,29 @@ def get_or_sync_repository(repo_full_name: str, commit_sha: str) -> str:
 
 
 
+def sync_repositories(repos: List[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+    """
+    Sync several repositories concurrently
+    
+    Args:
+        repos: List of (repo_full_name, commit_sha) pairs; commit_sha may be None for latest
+        
+    Returns:
+        Dictionary mapping repository name to local path for repositories that synced
+    """
+    synced = {}
+    
+    for repo_full_name, result in repository_sync.sync_many(repos, max_retries=config.max_retries):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to sync repository {repo_full_name}: {result}")
+        else:
+            synced[repo_full_name] = result
+    
+    logger.info(f"Synced {len(synced)}/{len(repos)} repositories")
+    return synced
+
+
+
 def decide_update_strategy(index_status: Dict[str, Any], repo_full_name: str,
                           before_commit: str, after_commit: str) -> str:
     """
@@ -202,8 +246,7 @@ def decide_update_strategy(index_status: Dict[str, Any], repo_full_name: str,
     
     # Get changed files to determine strategy
     try:
-        sync = RepositorySync(config.repo_storage_path)
-        added, modified, deleted = sync.get_changed_files(
+        added, modified, deleted = repository_sync.get_changed_files(
             repo_full_name, 
             before_commit, 
             after_commit
@@ -215,14 +258,26 @@ def decide_update_strategy(index_status: Dict[str, Any], repo_full_name: str,
             logger.info("No relevant files changed")
             return 'incremental'  # Will be a no-op
         
-        if total_changes > config.max_files_for_incremental:
+        # Weigh changes by size rather than count: many small files are cheap
+        # to re-parse, a few huge ones are not. Deleted files cost nothing.
+        file_sizes = repository_sync.get_changed_file_sizes(
+            repo_full_name,
+            after_commit,
+            added + modified
+        )
+        total_bytes = sum(file_sizes.values())
+        
+        if total_bytes > config.max_bytes_for_incremental:
             logger.info(
-                f"Too many files changed ({total_changes} > {config.max_files_for_incremental}), "
+                f"Changed files too large ({total_bytes} > {config.max_bytes_for_incremental} bytes), "
                 f"will perform full reindex"
             )
             return 'full'
         
-        logger.info(f"{total_changes} files changed, will perform incremental update")
+        logger.info(
+            f"{total_changes} files changed ({total_bytes} bytes), "
+            f"will perform incremental update"
+        )
         return 'incremental'
         
     except Exception as e:
@@ -231,6 +286,27 @@ def decide_update_strategy(index_status: Dict[str, Any], repo_full_name: str,
 
 
 
+def record_indexed_state(repo_name: str, commit_sha: str, file_paths: Optional[List[str]] = None,
+                         deleted_files: Optional[List[str]] = None):
+    """
+    Remember blob SHAs of what was just indexed so unchanged files are skipped next time
+    
+    Args:
+        repo_name: Repository name
+        commit_sha: Commit SHA that was indexed
+        file_paths: Files (re)indexed; None after a full index
+        deleted_files: Files removed from the index
+    """
+    if not commit_sha or commit_sha == 'unknown':
+        return
+    
+    try:
+        repository_sync.record_indexed_blobs(repo_name, commit_sha, file_paths, deleted_files)
+    except Exception as e:
+        logger.warning(f"Failed to record indexed blobs for {repo_name}: {e}")
+
+
+
 def execute_initial_index(repo_path: str, repo_name: str, commit_sha: str) -> Dict[str, Any]:
     """
     Execute initial full indexing for a repository
@@ -252,6 +328,7 @@ def execute_initial_index(repo_path: str, repo_name: str, commit_sha: str) -> Di
         )
         
         if result.get('success'):
+            record_indexed_state(repo_name, commit_sha)
             logger.info(
                 f"Initial indexing complete for {repo_name}: "
                 f"{result.get('total_functions', 0)} functions indexed"
@@ -299,6 +376,7 @@ def execute_full_reindex(repo_path: str, repo_name: str, commit_sha: str) -> Dic
         )
         
         if result.get('success'):
+            record_indexed_state(repo_name, commit_sha)
             logger.info(
                 f"Full re-indexing complete for {repo_name}: "
                 f"{result.get('total_functions', 0)} functions indexed"
@@ -339,20 +417,35 @@ def execute_incremental_update(repo_path: str, repo_name: str,
     Returns:
         Result dictionary
     """
-    logger.info(f"Starting incremental update for {repo_name}")
-    
     try:
         # Create incremental indexer
         indexer = IncrementalIndexer(repo_path, repo_name=repo_name)
         
-        # Perform incremental update
-        update_result = indexer.update_index(before_commit, after_commit)
+        # Perform incremental update on the files whose content actually changed
+        added, modified, deleted = repository_sync.get_changed_files(
+            repo_name,
+            before_commit,
+            after_commit
+        )
+        update_result = indexer.update_index(
+            before_commit,
+            after_commit,
+            changed_files=(added, modified, deleted)
+        )
         
         if update_result.success:
+            record_indexed_state(repo_name, after_commit, added + modified, deleted)
+            # One record per update; fields are also attached as attributes for structured handlers
             logger.info(
-                f"Incremental update complete for {repo_name}: "
-                f"{update_result.functions_updated} functions updated in "
-                f"{update_result.update_time_seconds:.2f}s"
+                "incremental_update_complete repo=%s functions=%d seconds=%.2f files_changed=%d",
+                repo_name, update_result.functions_updated,
+                update_result.update_time_seconds, update_result.files_changed,
+                extra={
+                    'repo': repo_name,
+                    'functions': update_result.functions_updated,
+                    'seconds': update_result.update_time_seconds,
+                    'files_changed': update_result.files_changed
+                }
             )
             return {
                 'success': True,
@@ -367,13 +460,18 @@ def execute_incremental_update(repo_path: str, repo_name: str,
         else:
             # Incremental update failed, try full reindex as fallback
             logger.warning(
-                f"Incremental update failed for {repo_name}: {update_result.error_msg}. "
-                f"Falling back to full reindex"
+                "incremental_update_failed repo=%s error=%s, falling back to full reindex",
+                repo_name, update_result.error_msg,
+                extra={'repo': repo_name, 'error': update_result.error_msg}
             )
             return execute_full_reindex(repo_path, repo_name, after_commit)
             
     except Exception as e:
-        logger.error(f"Incremental update failed for {repo_name}: {e}", exc_info=True)
-        # Try full reindex as fallback
-        logger.info(f"Attempting full reindex as fallback for {repo_name}")
+        # Not re-raised, so this is the only place the traceback gets logged
+        logger.error(
+            "incremental_update_failed repo=%s error=%s, falling back to full reindex",
+            repo_name, e,
+            extra={'repo': repo_name, 'error': str(e)},
+            exc_info=True
+        )
         return execute_full_reindex(repo_path, repo_name, after_commit)
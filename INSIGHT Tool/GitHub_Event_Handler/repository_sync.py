@@ -5,12 +5,58 @@ Handles cloning, updating, and syncing GitHub repositories locally
 
 import logging
 import subprocess
+import shlex
+import shutil
+import json
 import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict, Union, Iterator
+
+from config import Config
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
 
 logger = logging.getLogger(__name__)
 
+# File types tracked by the knowledge base
+_SUPPORTED_EXTENSIONS = frozenset({'.py', '.java'})
+
+
+def _is_supported(file_path: str) -> bool:
+    """Check whether a path has a supported extension (one set lookup, no suffix scan)"""
+    dot = file_path.rfind('.')
+    return dot != -1 and file_path[dot:] in _SUPPORTED_EXTENSIONS
+
+
+# Number of (repo, old_commit, new_commit) diffs remembered per instance
+_DIFF_CACHE_SIZE = 256
+
+# Caps clones/fetches running at once across all RepositorySync instances
+_git_semaphore = threading.Semaphore(Config.MAX_CONCURRENT_GIT_OPS)
+
+# Clone path -> lock serializing work on that clone. Module level because the
+# push and issue handlers each hold their own RepositorySync instance.
+_repo_locks: Dict[str, threading.RLock] = {}
+_repo_locks_guard = threading.Lock()
+
+
+class GitResult(subprocess.CompletedProcess):
+    """CompletedProcess holding raw git output, decoded only when a caller asks for text"""
+    
+    def text_stdout(self) -> str:
+        """Decode stdout as UTF-8"""
+        return self.stdout.decode('utf-8', errors='replace')
+
 
 class GitOperationError(Exception):
     """Raised when git operations fail"""
@@ -34,6 +80,22 @@ class RepositorySync:
         """
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
+        # repo_full_name -> local clone path
+        self._path_cache: Dict[str, Path] = {}
+        # (repo_full_name, old_commit, new_commit) -> classified diff, LRU ordered;
+        # commits are immutable so entries never go stale
+        self._diff_cache: 'OrderedDict[Tuple[str, str, str], Tuple[tuple, ...]]' = OrderedDict()
+        self._diff_cache_lock = threading.Lock()
+        # In-process libgit2 handles, reused across diffs (pygit2 is optional)
+        self._repo_cache: Dict[str, 'pygit2.Repository'] = {}
+        # repo_full_name -> file path -> blob SHA of the last indexed version
+        self._blob_cache: Dict[str, Dict[str, str]] = {}
+        self.blob_cache_path = self.base_path / '.blob_cache'
+        # Corrupted clones are renamed here and deleted by a background thread
+        self.trash_path = self.base_path / '.trash'
+        self._trash_queue: 'queue.Queue[Path]' = queue.Queue()
+        self._trash_thread: Optional[threading.Thread] = None
+        self._trash_lock = threading.Lock()
         logger.info(f"RepositorySync initialized with base path: {self.base_path}")
     
     def _get_repo_path(self, repo_full_name: str) -> Path:
@@ -46,62 +108,117 @@ class RepositorySync:
         Returns:
             Path object for local repository
         """
-        # Replace '/' with '_' to create valid directory name
-        safe_name = repo_full_name.replace('/', '_')
-        return self.base_path / safe_name
+        repo_path = self._path_cache.get(repo_full_name)
+        if repo_path is None:
+            # Replace '/' with '_' to create valid directory name
+            safe_name = repo_full_name.replace('/', '_')
+            repo_path = self._path_cache[repo_full_name] = self.base_path / safe_name
+        return repo_path
+    
+    def _get_lock(self, repo_full_name: str) -> threading.RLock:
+        """
+        Get the lock serializing git operations on one repository clone
+        
+        Operations on different repositories never contend.
+        
+        Args:
+            repo_full_name: Repository name (e.g., "owner/repo")
+            
+        Returns:
+            Re-entrant lock for the repository's local clone
+        """
+        key = str(self._get_repo_path(repo_full_name).resolve())
+        lock = _repo_locks.get(key)
+        if lock is None:
+            with _repo_locks_guard:
+                lock = _repo_locks.setdefault(key, threading.RLock())
+        return lock
     
-    def _run_git_command(self, command: List[str], cwd: Optional[Path] = None, 
-                        timeout: int = 300) -> subprocess.CompletedProcess:
+    def _run_git_command(self, command: Union[List[str], str], cwd: Optional[Path] = None, 
+                        timeout: int = 300, input_data: Optional[str] = None) -> GitResult:
         """
         Run git command with error handling
         
         Args:
-            command: Git command as list of strings
+            command: Git command as list of strings, or a shell command line
             cwd: Working directory for command
             timeout: Command timeout in seconds
+            input_data: Text to write to the command's stdin (optional)
             
         Returns:
-            CompletedProcess result
+            GitResult with undecoded stdout; use text_stdout() for text
             
         Raises:
             GitOperationError: If git command fails
         """
+        use_shell = isinstance(command, str)
+        command_str = command if use_shell else ' '.join(command)
+        
         try:
             result = subprocess.run(
                 command,
                 cwd=cwd,
+                input=input_data.encode('utf-8') if input_data is not None else None,
                 capture_output=True,
-                text=True,
                 timeout=timeout,
+                shell=use_shell,
                 check=False
             )
             
             if result.returncode != 0:
-                error_msg = f"Git command failed: {' '.join(command)}\nStderr: {result.stderr}"
+                stderr = result.stderr.decode('utf-8', errors='replace')
+                error_msg = f"Git command failed: {command_str}\nStderr: {stderr}"
                 logger.error(error_msg)
                 raise GitOperationError(error_msg)
             
-            return result
+            return GitResult(result.args, result.returncode, result.stdout, result.stderr)
             
         except subprocess.TimeoutExpired as e:
-            error_msg = f"Git command timed out after {timeout}s: {' '.join(command)}"
+            error_msg = f"Git command timed out after {timeout}s: {command_str}"
             logger.error(error_msg)
             raise GitOperationError(error_msg) from e
         except Exception as e:
-            error_msg = f"Git command error: {' '.join(command)}\nError: {str(e)}"
+            error_msg = f"Git command error: {command_str}\nError: {str(e)}"
             logger.error(error_msg)
             raise GitOperationError(error_msg) from e
+    
+    def _run_git_pipeline(self, commands: List[List[str]], cwd: Optional[Path] = None,
+                          timeout: int = 300) -> GitResult:
+        """
+        Run several git commands in a single shell invocation, stopping at the first failure
+        
+        Args:
+            commands: Git commands, each as list of strings
+            cwd: Working directory for the commands
+            timeout: Timeout in seconds for the whole pipeline
+            
+        Returns:
+            GitResult of the shell invocation
+            
+        Raises:
+            GitOperationError: If any git command fails
+        """
+        # cmd.exe does not understand POSIX single-quote escaping
+        quote = subprocess.list2cmdline if os.name == 'nt' else shlex.join
+        command_line = ' && '.join(quote(command) for command in commands)
+        return self._run_git_command(command_line, cwd=cwd, timeout=timeout)
 
     
     def sync_repository(self, repo_full_name: str, commit_sha: Optional[str] = None, 
-                       max_retries: int = 2) -> str:
+                       max_retries: int = 2, force_fresh: bool = False) -> str:
         """
         Sync repository to latest commit or specific SHA
         
+        A failed update first tries an in-place repair of the clone; it is
+        only discarded and re-cloned if the repair fails or the update keeps
+        failing afterwards. A successful repair grants one extra attempt, so
+        the re-clone fallback is still reached when max_retries is small.
+        
         Args:
             repo_full_name: Repository name (e.g., "owner/repo")
             commit_sha: Specific commit to sync to (optional, defaults to latest)
             max_retries: Maximum number of retry attempts
+            force_fresh: Discard the clone on the first failure without attempting a repair
             
         Returns:
             Local path to synced repository
@@ -110,35 +227,177 @@ class RepositorySync:
             RepositorySyncError: If synchronization fails after retries
         """
         repo_path = self._get_repo_path(repo_full_name)
+        repair_attempted = force_fresh
+        attempts_allowed = max_retries
+        attempt = 0
+        
+        # Same-repository syncs (e.g. push + installation webhooks) must not
+        # run git in the same clone at once; different repositories proceed in parallel
+        with self._get_lock(repo_full_name):
+            while True:
+                try:
+                    with _git_semaphore:
+                        if repo_path.exists():
+                            # Repository exists, update it
+                            logger.info(f"Updating existing repository: {repo_full_name}")
+                            self._update_repository(repo_path, commit_sha)
+                        else:
+                            # Clone repository
+                            logger.info(f"Cloning repository: {repo_full_name}")
+                            self._clone_repository(repo_full_name, repo_path, commit_sha)
+                    
+                    logger.info(f"Repository synced successfully: {repo_full_name} at {commit_sha or 'latest'}")
+                    return str(repo_path)
+                    
+                except GitOperationError as e:
+                    if attempt < attempts_allowed - 1:
+                        logger.warning(f"Sync attempt {attempt + 1} failed, retrying: {e}")
+                        # If update failed, try repairing in place before re-cloning from scratch
+                        if repo_path.exists():
+                            repaired = False
+                            if not repair_attempted:
+                                repair_attempted = True
+                                with _git_semaphore:
+                                    repaired = self._repair_repository(repo_path)
+                                if repaired:
+                                    attempts_allowed += 1
+                            if not repaired:
+                                logger.info(f"Removing corrupted repository: {repo_path}")
+                                self._repo_cache.pop(str(repo_path), None)
+                                self._move_to_trash(repo_path)
+                        
+                        # Back off with jitter so concurrent failures don't retry in lockstep
+                        delay = min(Config.GIT_RETRY_MAX_BACKOFF, (2 ** attempt) + random.random())
+                        logger.info(f"Retrying {repo_full_name} in {delay:.1f}s")
+                        time.sleep(delay)
+                        attempt += 1
+                    else:
+                        error_msg = f"Failed to sync repository {repo_full_name} after {attempt + 1} attempts"
+                        logger.error(error_msg)
+                        raise RepositorySyncError(error_msg) from e
+    
+    def _repair_repository(self, repo_path: Path) -> bool:
+        """
+        Clear stale lock files and verify object connectivity of a clone
         
-        for attempt in range(max_retries):
+        Args:
+            repo_path: Local path to repository
+            
+        Returns:
+            True if the clone is intact and can be updated in place
+        """
+        git_dir = repo_path / '.git'
+        if not git_dir.is_dir():
+            return False
+        
+        # Locks left behind by a killed git process block every later command
+        stale_locks = list(git_dir.glob('*.lock'))
+        if (git_dir / 'refs').is_dir():
+            stale_locks.extend((git_dir / 'refs').rglob('*.lock'))
+        for lock_file in stale_locks:
+            logger.info(f"Removing stale lock file: {lock_file}")
             try:
-                if repo_path.exists():
-                    # Repository exists, update it
-                    logger.info(f"Updating existing repository: {repo_full_name}")
-                    self._update_repository(repo_path, commit_sha)
-                else:
-                    # Clone repository
-                    logger.info(f"Cloning repository: {repo_full_name}")
-                    self._clone_repository(repo_full_name, repo_path, commit_sha)
-                
-                logger.info(f"Repository synced successfully: {repo_full_name} at {commit_sha or 'latest'}")
-                return str(repo_path)
-                
-            except GitOperationError as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Sync attempt {attempt + 1} failed, retrying: {e}")
-                    # If update failed, try removing and cloning fresh
-                    if repo_path.exists():
-                        logger.info(f"Removing corrupted repository: {repo_path}")
-                        import shutil
-                        shutil.rmtree(repo_path, ignore_errors=True)
-                else:
-                    error_msg = f"Failed to sync repository {repo_full_name} after {max_retries} attempts"
-                    logger.error(error_msg)
-                    raise RepositorySyncError(error_msg) from e
-        
-        raise RepositorySyncError(f"Failed to sync repository {repo_full_name}")
+                lock_file.unlink()
+            except OSError as e:
+                logger.warning(f"Failed to remove lock file {lock_file}: {e}")
+                return False
+        
+        try:
+            self._run_git_command(
+                ['git', 'fsck', '--no-dangling', '--connectivity-only', '--no-progress'],
+                cwd=repo_path
+            )
+        except GitOperationError:
+            logger.warning(f"Repository failed integrity check: {repo_path}")
+            return False
+        
+        logger.info(f"Repository passed integrity check, retrying in place: {repo_path}")
+        return True
+    
+    def sync_many(self, repos: List[Tuple[str, Optional[str]]],
+                  max_retries: int = 2) -> List[Tuple[str, Union[str, Exception]]]:
+        """
+        Sync several repositories concurrently
+        
+        Clones and fetches are network bound and run in git subprocesses, so
+        threads give real parallelism. Each repository has its own directory,
+        so no state is shared between workers.
+        
+        Args:
+            repos: List of (repo_full_name, commit_sha) pairs; commit_sha may be None for latest
+            max_retries: Maximum number of retry attempts per repository
+            
+        Returns:
+            List of (repo_full_name, local path or the exception raised), in input order
+        """
+        if not repos:
+            return []
+        
+        max_workers = min(len(repos), (os.cpu_count() or 1) * 2)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.sync_repository, repo_full_name, commit_sha, max_retries)
+                for repo_full_name, commit_sha in repos
+            ]
+        
+        results = []
+        for (repo_full_name, _), future in zip(repos, futures):
+            try:
+                results.append((repo_full_name, future.result()))
+            except Exception as e:
+                results.append((repo_full_name, e))
+        
+        return results
+    
+    def _move_to_trash(self, repo_path: Path):
+        """
+        Remove a repository directory without blocking on the recursive delete
+        
+        The directory is renamed into the trash folder (a single metadata
+        operation) and deleted later by a background thread.
+        
+        Args:
+            repo_path: Local path to repository
+        """
+        self.trash_path.mkdir(parents=True, exist_ok=True)
+        self._start_trash_thread()
+        trash_entry = self.trash_path / f"{repo_path.name}-{uuid.uuid4().hex}"
+        
+        try:
+            os.rename(repo_path, trash_entry)
+        except OSError as e:
+            # e.g. files still open on Windows: fall back to deleting in place
+            logger.warning(f"Could not move {repo_path} to trash, deleting inline: {e}")
+            shutil.rmtree(repo_path, ignore_errors=True)
+            return
+        
+        self._trash_queue.put(trash_entry)
+    
+    def _start_trash_thread(self):
+        """Start the trash cleanup thread on first use, queueing leftovers from earlier runs"""
+        with self._trash_lock:
+            if self._trash_thread is not None:
+                return
+            
+            for leftover in self.trash_path.iterdir():
+                self._trash_queue.put(leftover)
+            
+            self._trash_thread = threading.Thread(
+                target=self._drain_trash,
+                name="repository-trash-cleanup",
+                daemon=True
+            )
+            self._trash_thread.start()
+    
+    def _drain_trash(self):
+        """Delete trashed repository directories as they are queued"""
+        while True:
+            trash_entry = self._trash_queue.get()
+            try:
+                shutil.rmtree(trash_entry, ignore_errors=True)
+                logger.info(f"Deleted trashed repository: {trash_entry}")
+            finally:
+                self._trash_queue.task_done()
     
     def _clone_repository(self, repo_full_name: str, repo_path: Path, 
                          commit_sha: Optional[str] = None):
@@ -152,14 +411,21 @@ class RepositorySync:
         """
         clone_url = f"https://github.com/{repo_full_name}.git"
         
-        # Clone repository
-        self._run_git_command(['git', 'clone', clone_url, str(repo_path)])
-        logger.info(f"Cloned repository to {repo_path}")
+        # Partial clone: full commit/tree history (so diffs between any two
+        # pushed commits still resolve) but blobs are only downloaded for the
+        # checked-out tree. Later fetches inherit the filter from the remote config.
+        clone_command = ['git', 'clone', '--filter=blob:none']
         
-        # Checkout specific commit if provided
         if commit_sha:
-            self._run_git_command(['git', 'checkout', commit_sha], cwd=repo_path)
-            logger.info(f"Checked out commit {commit_sha}")
+            # Clone without checkout and checkout the requested commit in the same spawn
+            self._run_git_pipeline([
+                clone_command + ['--no-checkout', clone_url, str(repo_path)],
+                ['git', '-C', str(repo_path), 'checkout', commit_sha]
+            ])
+            logger.info(f"Cloned repository to {repo_path} at commit {commit_sha}")
+        else:
+            self._run_git_command(clone_command + [clone_url, str(repo_path)])
+            logger.info(f"Cloned repository to {repo_path}")
     
     def _update_repository(self, repo_path: Path, commit_sha: Optional[str] = None):
         """
@@ -169,31 +435,141 @@ class RepositorySync:
             repo_path: Local path to repository
             commit_sha: Specific commit to checkout
         """
-        # Fetch latest changes
-        self._run_git_command(['git', 'fetch', 'origin'], cwd=repo_path)
-        logger.info(f"Fetched latest changes for {repo_path}")
-        
         # Checkout specific commit or latest from default branch
         if commit_sha:
-            self._run_git_command(['git', 'checkout', commit_sha], cwd=repo_path)
-            logger.info(f"Checked out commit {commit_sha}")
+            self._run_git_pipeline([
+                ['git', 'fetch', 'origin'],
+                ['git', 'checkout', commit_sha]
+            ], cwd=repo_path)
+            logger.info(f"Fetched latest changes and checked out commit {commit_sha}")
         else:
-            # Get default branch and checkout latest
-            result = self._run_git_command(
-                ['git', 'symbolic-ref', 'refs/remotes/origin/HEAD', '--short'],
-                cwd=repo_path
-            )
-            default_branch = result.stdout.strip().replace('origin/', '')
-            self._run_git_command(['git', 'checkout', default_branch], cwd=repo_path)
-            self._run_git_command(['git', 'pull'], cwd=repo_path)
-            logger.info(f"Updated to latest {default_branch}")
+            # Fetching the remote HEAD leaves exactly its tip in FETCH_HEAD, so
+            # the default branch name never needs to be looked up
+            self._run_git_pipeline([
+                ['git', 'fetch', 'origin', 'HEAD'],
+                ['git', 'reset', '--hard', 'FETCH_HEAD']
+            ], cwd=repo_path)
+            logger.info("Updated to latest default branch")
 
     
-    def get_changed_files(self, repo_full_name: str, old_commit: str, 
+    def _get_pygit2_repo(self, repo_path: Path) -> 'pygit2.Repository':
+        """
+        Get a cached pygit2 handle for a local repository
+        
+        Args:
+            repo_path: Local path to repository
+            
+        Returns:
+            pygit2.Repository instance
+        """
+        key = str(repo_path)
+        repo = self._repo_cache.get(key)
+        if repo is None:
+            repo = pygit2.Repository(key)
+            self._repo_cache[key] = repo
+        return repo
+    
+    def _diff_name_status(self, repo_path: Path, old_commit: str,
+                          new_commit: str) -> Iterator[Tuple[str, str, str]]:
+        """
+        List changed paths between two commits
+        
+        Uses libgit2 in-process when pygit2 is installed and falls back to a
+        git diff subprocess otherwise (or when libgit2 cannot read the objects,
+        e.g. blobs missing from a partial clone during rename detection).
+        
+        Args:
+            repo_path: Local path to repository
+            old_commit: Old commit SHA
+            new_commit: New commit SHA
+            
+        Returns:
+            Iterator of (status, old_path, new_path) with git name-status letters
+        """
+        if pygit2 is not None:
+            try:
+                repo = self._get_pygit2_repo(repo_path)
+                diff = repo.diff(old_commit, new_commit)
+                diff.find_similar()
+                return iter([
+                    (delta.status_char(), delta.old_file.path, delta.new_file.path)
+                    for delta in diff.deltas
+                ])
+            except (pygit2.GitError, KeyError, ValueError) as e:
+                logger.warning(f"pygit2 diff failed, falling back to git subprocess: {e}")
+        
+        return self._stream_git_diff(repo_path, old_commit, new_commit)
+    
+    def _stream_git_diff(self, repo_path: Path, old_commit: str, new_commit: str,
+                         timeout: int = 30) -> Iterator[Tuple[str, str, str]]:
+        """
+        Stream 'git diff --name-status' entries as git produces them
+        
+        Output is parsed chunk by chunk so only the entries the caller keeps
+        stay in memory, rather than the whole diff listing.
+        
+        Args:
+            repo_path: Local path to repository
+            old_commit: Old commit SHA
+            new_commit: New commit SHA
+            timeout: Seconds to wait for git to exit once output is consumed
+            
+        Yields:
+            (status, old_path, new_path) with git name-status letters
+            
+        Raises:
+            GitOperationError: If git diff fails
+        """
+        # -z: NUL-delimited, unquoted paths (safe for whitespace/non-ASCII names)
+        command = ['git', 'diff', '--name-status', '-z', '-M', old_commit, new_commit]
+        try:
+            process = subprocess.Popen(command, cwd=repo_path,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise GitOperationError(f"Git command error: {' '.join(command)}\nError: {e}") from e
+        
+        try:
+            # Token stream is: status NUL path NUL [new_path NUL for renames/copies]
+            pending = b''
+            entry: List[str] = []
+            while True:
+                chunk = process.stdout.read1(65536)
+                if not chunk:
+                    break
+                *tokens, pending = (pending + chunk).split(b'\0')
+                for token in tokens:
+                    entry.append(token.decode('utf-8', errors='replace'))
+                    status = entry[0]
+                    if not status:
+                        entry.clear()
+                    elif len(entry) == (3 if status[0] in 'RC' else 2):
+                        yield status, entry[1], entry[-1]
+                        entry.clear()
+            
+            stderr = process.stderr.read()
+            if process.wait(timeout=timeout) != 0:
+                error_msg = (f"Git command failed: {' '.join(command)}\n"
+                             f"Stderr: {stderr.decode('utf-8', errors='replace')}")
+                logger.error(error_msg)
+                raise GitOperationError(error_msg)
+        except subprocess.TimeoutExpired as e:
+            raise GitOperationError(f"Git command timed out after {timeout}s: {' '.join(command)}") from e
+        finally:
+            # Consumer stopped early or parsing failed
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+    
+    def get_changed_files(self, repo_full_name: str, old_commit: str,
                          new_commit: str) -> Tuple[List[str], List[str], List[str]]:
         """
         Get files changed between two commits
         
+        Renamed files are reported as a deletion of the old path and an
+        addition of the new one, since indexed IDs include the file path.
+        
         Args:
             repo_full_name: Repository name (e.g., "owner/repo")
             old_commit: Old commit SHA
@@ -210,58 +586,245 @@ class RepositorySync:
         if not repo_path.exists():
             raise RepositorySyncError(f"Repository not found: {repo_path}")
         
-        try:
-            # Run git diff to get changed files with status
-            result = self._run_git_command(
-                ['git', 'diff', '--name-status', old_commit, new_commit],
-                cwd=repo_path,
-                timeout=30
-            )
-            
-            # Parse output
-            added_files = []
-            modified_files = []
-            deleted_files = []
-            
-            # Supported file extensions
-            supported_extensions = ('.py', '.java')
-            
-            for line in result.stdout.strip().split('\n'):
-                if not line:
-                    continue
+        with self._get_lock(repo_full_name):
+            try:
+                # Redelivered webhooks diff the same range again; reuse the result
+                key = (repo_full_name, old_commit, new_commit)
+                with self._diff_cache_lock:
+                    cached = self._diff_cache.get(key)
+                    if cached is not None:
+                        self._diff_cache.move_to_end(key)
                 
-                parts = line.split('\t')
-                if len(parts) < 2:
-                    continue
+                if cached is None:
+                    cached = self._classify_diff(repo_path, old_commit, new_commit)
+                    with self._diff_cache_lock:
+                        self._diff_cache[key] = cached
+                        if len(self._diff_cache) > _DIFF_CACHE_SIZE:
+                            self._diff_cache.popitem(last=False)
                 
-                status = parts[0]
-                file_path = parts[1]
+                added_files, modified_files, deleted_files = map(list, cached)
                 
-                # Only track supported file types
-                if not file_path.endswith(supported_extensions):
-                    continue
+                # Skip files whose content matches what is already indexed. Not
+                # cached: the indexed state changes once this diff is processed.
+                modified_files = self._filter_indexed_blobs(
+                    repo_full_name, repo_path, new_commit, modified_files
+                )
+                
+                logger.info(
+                    f"Changed files in {repo_full_name}: "
+                    f"{len(added_files)} added, {len(modified_files)} modified, "
+                    f"{len(deleted_files)} deleted"
+                )
                 
-                if status == 'A':
-                    added_files.append(file_path)
-                elif status == 'M':
-                    modified_files.append(file_path)
-                elif status == 'D':
+                return added_files, modified_files, deleted_files
+                
+            except GitOperationError as e:
+                logger.error(f"Failed to get changed files: {e}")
+                raise
+    
+    def _classify_diff(self, repo_path: Path, old_commit: str, new_commit: str
+                       ) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]:
+        """
+        Sort supported files changed between two commits by kind of change
+        
+        Args:
+            repo_path: Local path to repository
+            old_commit: Old commit SHA
+            new_commit: New commit SHA
+            
+        Returns:
+            Immutable (added, modified, deleted) file tuples
+        """
+        added_files = []
+        modified_files = []
+        deleted_files = []
+        
+        for status, file_path, new_path in self._diff_name_status(repo_path, old_commit, new_commit):
+            if status.startswith('R'):  # Renamed: old path leaves the index, new path enters it
+                if _is_supported(file_path):
                     deleted_files.append(file_path)
-                elif status.startswith('R'):  # Renamed
-                    # Treat renamed files as modified
-                    if len(parts) >= 3:
-                        new_path = parts[2]
-                        if new_path.endswith(supported_extensions):
-                            modified_files.append(new_path)
+                if _is_supported(new_path):
+                    added_files.append(new_path)
+                continue
+            
+            # Only track supported file types
+            if not _is_supported(file_path):
+                continue
+            
+            if status == 'A':
+                added_files.append(file_path)
+            elif status == 'M':
+                modified_files.append(file_path)
+            elif status == 'D':
+                deleted_files.append(file_path)
+        
+        return tuple(added_files), tuple(modified_files), tuple(deleted_files)
+    
+    def get_changed_file_sizes(self, repo_full_name: str, commit: str,
+                               file_paths: List[str]) -> Dict[str, int]:
+        """
+        Get blob sizes in bytes of files at a commit
+        
+        Args:
+            repo_full_name: Repository name (e.g., "owner/repo")
+            commit: Commit SHA to read file sizes from
+            file_paths: Repository-relative file paths
+            
+        Returns:
+            Dictionary mapping file path to size in bytes (missing files are omitted)
+            
+        Raises:
+            GitOperationError: If git cat-file fails
+        """
+        repo_path = self._get_repo_path(repo_full_name)
+        
+        if not repo_path.exists():
+            raise RepositorySyncError(f"Repository not found: {repo_path}")
+        
+        if not file_paths:
+            return {}
+        
+        sizes = self._batch_check(repo_path, commit, file_paths, '%(objectsize)')
+        return {file_path: int(size) for file_path, size in sizes.items()}
+    
+    def _batch_check(self, repo_path: Path, commit: str, file_paths: List[str],
+                     object_format: str) -> Dict[str, str]:
+        """
+        Query object info for many files at a commit with a single git cat-file call
+        
+        Args:
+            repo_path: Local path to repository
+            commit: Commit SHA the paths are resolved against
+            file_paths: Repository-relative file paths
+            object_format: git cat-file --batch-check format (e.g. "%(objectname)")
+            
+        Returns:
+            Dictionary mapping file path to formatted output (missing files are omitted)
+        """
+        if not file_paths:
+            return {}
+        
+        object_names = ''.join(f"{commit}:{path}\n" for path in file_paths)
+        result = self._run_git_command(
+            ['git', 'cat-file', f'--batch-check={object_format}'],
+            cwd=repo_path,
+            timeout=30,
+            input_data=object_names
+        )
+        
+        info = {}
+        for file_path, line in zip(file_paths, result.text_stdout().splitlines()):
+            # Unknown objects are reported as "<name> missing"
+            if not line.endswith(' missing'):
+                info[file_path] = line
+        
+        return info
+    
+    def _get_blob_cache_file(self, repo_full_name: str) -> Path:
+        """Get the on-disk location of a repository's indexed-blob cache"""
+        return self.blob_cache_path / f"{repo_full_name.replace('/', '_')}.json"
+    
+    def _load_blob_cache(self, repo_full_name: str) -> Dict[str, str]:
+        """
+        Get the indexed-blob cache for a repository, loading it from disk on first use
+        
+        Args:
+            repo_full_name: Repository name (e.g., "owner/repo")
+            
+        Returns:
+            Dictionary mapping file path to blob SHA of the last indexed version
+        """
+        cache = self._blob_cache.get(repo_full_name)
+        if cache is None:
+            cache = {}
+            cache_file = self._get_blob_cache_file(repo_full_name)
+            if cache_file.exists():
+                try:
+                    with open(cache_file, 'r', encoding='utf-8') as f:
+                        cache = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable blob cache {cache_file}: {e}")
+            self._blob_cache[repo_full_name] = cache
+        return cache
+    
+    def _filter_indexed_blobs(self, repo_full_name: str, repo_path: Path, commit: str,
+                              file_paths: List[str]) -> List[str]:
+        """
+        Drop files whose blob at a commit is identical to the last indexed version
+        
+        Args:
+            repo_full_name: Repository name (e.g., "owner/repo")
+            repo_path: Local path to repository
+            commit: Commit SHA the files are compared at
+            file_paths: Repository-relative file paths
             
+        Returns:
+            File paths whose content differs from the indexed version (or is unknown)
+        """
+        cache = self._load_blob_cache(repo_full_name)
+        if not cache or not file_paths:
+            return file_paths
+        
+        blob_shas = self._batch_check(repo_path, commit, file_paths, '%(objectname)')
+        changed = [
+            file_path for file_path in file_paths
+            if file_path not in cache or cache[file_path] != blob_shas.get(file_path)
+        ]
+        
+        if len(changed) < len(file_paths):
             logger.info(
-                f"Changed files in {repo_full_name}: "
-                f"{len(added_files)} added, {len(modified_files)} modified, "
-                f"{len(deleted_files)} deleted"
+                f"Skipping {len(file_paths) - len(changed)} modified files in {repo_full_name} "
+                f"with unchanged content"
             )
+        return changed
+    
+    def record_indexed_blobs(self, repo_full_name: str, commit: str,
+                             file_paths: Optional[List[str]] = None,
+                             deleted_files: Optional[List[str]] = None):
+        """
+        Record blob SHAs of files after they were indexed and persist the cache
+        
+        Args:
+            repo_full_name: Repository name (e.g., "owner/repo")
+            commit: Commit SHA that was indexed
+            file_paths: Files (re)indexed at the commit; None records the whole tree (full index)
+            deleted_files: Files removed from the index
             
-            return added_files, modified_files, deleted_files
-            
-        except GitOperationError as e:
-            logger.error(f"Failed to get changed files: {e}")
-            raise
+        Raises:
+            GitOperationError: If reading blob SHAs fails
+        """
+        repo_path = self._get_repo_path(repo_full_name)
+        
+        if not repo_path.exists():
+            raise RepositorySyncError(f"Repository not found: {repo_path}")
+        
+        if file_paths is None:
+            # Full index: replace the cache with every supported file in the tree
+            result = self._run_git_command(
+                ['git', 'ls-tree', '-r', '-z', commit],
+                cwd=repo_path,
+                timeout=60
+            )
+            cache = {}
+            for entry in result.text_stdout().split('\0'):
+                if not entry:
+                    continue
+                # Format: <mode> SP <type> SP <sha> TAB <path>
+                info, file_path = entry.split('\t', 1)
+                _, object_type, blob_sha = info.split(' ')
+                if object_type == 'blob' and _is_supported(file_path):
+                    cache[file_path] = blob_sha
+            self._blob_cache[repo_full_name] = cache
+        else:
+            cache = self._load_blob_cache(repo_full_name)
+            cache.update(self._batch_check(repo_path, commit, file_paths, '%(objectname)'))
+            for file_path in deleted_files or []:
+                cache.pop(file_path, None)
+        
+        # Write atomically so a crash never leaves a truncated cache behind
+        self.blob_cache_path.mkdir(parents=True, exist_ok=True)
+        cache_file = self._get_blob_cache_file(repo_full_name)
+        tmp_file = cache_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, cache_file)
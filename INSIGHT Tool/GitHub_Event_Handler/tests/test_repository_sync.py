@@ -0,0 +1,168 @@
+import unittest
+import tempfile
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from GitHub_Event_Handler import repository_sync
+from GitHub_Event_Handler.repository_sync import RepositorySync
+
+
+def git(repo_dir, *args):
+    """Run a git command in a test repository and return its stdout"""
+    result = subprocess.run(
+        ['git', *args],
+        cwd=repo_dir,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+
+class TestRepositorySyncChangedFiles(unittest.TestCase):
+    """Verify change detection between two commits of a local clone"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_name = "test/sync_repo"
+        self.sync = RepositorySync(self.temp_dir)
+
+        # Create a repository where RepositorySync expects the clone
+        self.repo_dir = Path(self.temp_dir) / "test_sync_repo"
+        self.repo_dir.mkdir()
+        git(self.repo_dir, 'init', '-q')
+        git(self.repo_dir, 'config', 'user.email', 'test@example.com')
+        git(self.repo_dir, 'config', 'user.name', 'Test')
+
+        self._write('keep.py', "def keep():\n    return 1\n")
+        self._write('remove.java', "class Remove {}\n")
+        self._write('moved.py', "def moved():\n    return 'unchanged body'\n" * 5)
+        self._write('edited.py', "def edited():\n    return 'original body'\n" * 20)
+        self._write('notes.txt', "not indexed\n")
+        git(self.repo_dir, 'add', '-A')
+        git(self.repo_dir, 'commit', '-q', '-m', 'initial')
+        self.old_commit = git(self.repo_dir, 'rev-parse', 'HEAD')
+
+        self._write('keep.py', "def keep():\n    return 2\n")
+        self._write('dir with space/new file.py', "def added():\n    pass\n")
+        self._write('notes.txt', "still not indexed\n")
+        (self.repo_dir / 'remove.java').unlink()
+        git(self.repo_dir, 'mv', 'moved.py', 'renamed.py')
+        git(self.repo_dir, 'mv', 'edited.py', 'edited_renamed.py')
+        self._write('edited_renamed.py', "def edited():\n    return 'original body'\n" * 20 + "# edited\n")
+        git(self.repo_dir, 'add', '-A')
+        git(self.repo_dir, 'commit', '-q', '-m', 'changes')
+        self.new_commit = git(self.repo_dir, 'rev-parse', 'HEAD')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, relative_path, content):
+        path = self.repo_dir / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    def _assert_changes(self):
+        added, modified, deleted = self.sync.get_changed_files(
+            self.repo_name, self.old_commit, self.new_commit
+        )
+        self.assertEqual(sorted(added), ['dir with space/new file.py', 'edited_renamed.py', 'renamed.py'])
+        self.assertEqual(modified, ['keep.py'])
+        self.assertEqual(sorted(deleted), ['edited.py', 'moved.py', 'remove.java'])
+
+    def test_changed_files_subprocess(self):
+        """Test NUL-delimited git diff parsing without pygit2"""
+        with patch.object(repository_sync, 'pygit2', None):
+            self._assert_changes()
+
+    @unittest.skipIf(repository_sync.pygit2 is None, "pygit2 not installed")
+    def test_changed_files_pygit2(self):
+        """Test in-process diff through pygit2"""
+        self._assert_changes()
+
+    def test_changed_files_memoized(self):
+        """Test that repeating a commit range does not diff again"""
+        first = self.sync.get_changed_files(self.repo_name, self.old_commit, self.new_commit)
+        with patch.object(self.sync, '_diff_name_status', side_effect=AssertionError("diffed twice")):
+            second = self.sync.get_changed_files(self.repo_name, self.old_commit, self.new_commit)
+        self.assertEqual(first, second)
+
+    def test_changed_file_sizes(self):
+        """Test blob sizes are read at the new commit and missing files are omitted"""
+        sizes = self.sync.get_changed_file_sizes(
+            self.repo_name, self.new_commit, ['keep.py', 'remove.java']
+        )
+        self.assertEqual(sizes, {'keep.py': len("def keep():\n    return 2\n")})
+
+    def test_indexed_blobs_skip_unchanged_modified_files(self):
+        """Test that modified files already indexed at the same content are skipped"""
+        # Index the new commit, then a later diff reports keep.py as modified again
+        self.sync.record_indexed_blobs(self.repo_name, self.new_commit)
+        cache_file = Path(self.temp_dir) / '.blob_cache' / 'test_sync_repo.json'
+        self.assertTrue(cache_file.exists())
+
+        # A fresh instance reloads the persisted cache
+        sync = RepositorySync(self.temp_dir)
+        added, modified, deleted = sync.get_changed_files(
+            self.repo_name, self.old_commit, self.new_commit
+        )
+        self.assertEqual(modified, [])
+        self.assertEqual(sorted(added), ['dir with space/new file.py', 'edited_renamed.py', 'renamed.py'])
+        self.assertEqual(sorted(deleted), ['edited.py', 'moved.py', 'remove.java'])
+
+    def test_update_to_latest_default_branch(self):
+        """Test that a sync without a SHA resets the clone to the remote default branch tip"""
+        origin = Path(self.temp_dir) / 'origin.git'
+        git(self.temp_dir, 'clone', '-q', '--bare', str(self.repo_dir), str(origin))
+        git(self.temp_dir, 'clone', '-q', str(origin), 'test_cached_repo')
+        clone_dir = Path(self.temp_dir) / 'test_cached_repo'
+        git(clone_dir, 'checkout', '-q', self.old_commit)
+
+        self.sync.sync_repository("test/cached_repo")
+
+        self.assertEqual(git(clone_dir, 'rev-parse', 'HEAD'), self.new_commit)
+
+    def test_repair_removes_stale_locks(self):
+        """Test that repair clears leftover lock files on an intact clone"""
+        lock_file = self.repo_dir / '.git' / 'index.lock'
+        lock_file.touch()
+
+        self.assertTrue(self.sync._repair_repository(self.repo_dir))
+        self.assertFalse(lock_file.exists())
+
+    def test_reclone_after_successful_repair(self):
+        """Test that a clone still failing after a successful repair is re-cloned"""
+        failure = repository_sync.GitOperationError("fetch failed")
+        with patch.object(self.sync, '_update_repository', side_effect=failure), \
+                patch.object(self.sync, '_repair_repository', return_value=True) as repair, \
+                patch.object(self.sync, '_move_to_trash', side_effect=shutil.rmtree) as trash, \
+                patch.object(self.sync, '_clone_repository') as clone, \
+                patch.object(repository_sync.time, 'sleep'):
+            self.sync.sync_repository(self.repo_name, max_retries=2)
+
+        repair.assert_called_once()
+        trash.assert_called_once_with(self.repo_dir)
+        clone.assert_called_once()
+
+    def test_move_to_trash(self):
+        """Test that a removed repository is renamed away and deleted in background"""
+        self.sync._move_to_trash(self.repo_dir)
+        self.assertFalse(self.repo_dir.exists())
+
+        self.sync._trash_queue.join()
+        self.assertEqual(list(self.sync.trash_path.iterdir()), [])
+
+    def test_missing_repository(self):
+        """Test that an unknown repository raises RepositorySyncError"""
+        with self.assertRaises(repository_sync.RepositorySyncError):
+            self.sync.get_changed_files("test/missing", self.old_commit, self.new_commit)
+
+
+if __name__ == '__main__':
+    unittest.main()
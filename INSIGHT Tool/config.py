@@ -12,6 +12,8 @@ class Config:
     
     # Concurrency
     MAX_WORKERS = int(os.getenv('POOL_PROCESSOR_MAX_WORKERS', 4))
+    MAX_CONCURRENT_GIT_OPS = int(os.getenv('MAX_CONCURRENT_GIT_OPS', 8))
+    GIT_RETRY_MAX_BACKOFF = float(os.getenv('GIT_RETRY_MAX_BACKOFF', 30))
     
     # Database
     DB_PATH = os.getenv('DB_PATH', 'issues.db')
@@ -4,8 +4,8 @@ from config import config
 import os
 import logging
 from GitHub_Event_Handler.processIssueEvents import process_issue_event
-from GitHub_Event_Handler.processPushEvents import process_push_event
-from GitHub_Event_Handler.processInstallationEvents import process_installation_event
+from GitHub_Event_Handler.processPushEvents import process_push_event, is_default_branch_ref
+from GitHub_Event_Handler.processInstallationEvents import process_installation_event, sync_installation_repositories
 
 # Initialize App
 app = Flask(__name__)
@@ -24,6 +24,21 @@ logger = logging.getLogger(__name__)
 # ThreadPool for concurrent webhook processing
 executor = ThreadPoolExecutor(max_workers=app.config['MAX_WORKERS'])
 
+
+def install_repositories(repos, action):
+    """
+    Sync all installed repositories in one concurrent batch, then index each in background
+    
+    Args:
+        repos: List of (repo_full_name, default_branch) pairs
+        action: Installation action ('created' or 'added')
+    """
+    synced = sync_installation_repositories(repos)
+    for repo_full_name, default_branch in repos:
+        executor.submit(process_installation_event, repo_full_name, default_branch, action,
+                        synced.get(repo_full_name))
+
+
 @app.route('/', methods=['GET'])
 def homepage():
     """
@@ -60,7 +75,7 @@ def api_git_msg():
                 ref = data.get('ref', '')
                 
                 # Only process main/master branch pushes
-                if not (ref.endswith('/main') or ref.endswith('/master')):
+                if not is_default_branch_ref(ref):
                     return f"Ignoring push to non-main branch: {ref}", 200
                 
                 # Process push in background
@@ -76,11 +91,9 @@ def api_git_msg():
             installed_repos = data['repositories']
             logging.info(f"Number of repositories to install: {len(installed_repos)}")
             
-            for repo in installed_repos:
-                repo_full_name = repo['full_name']
-                default_branch = repo.get('default_branch', 'master')
-                # Process in background
-                executor.submit(process_installation_event, repo_full_name, default_branch, 'created')
+            repos = [(repo['full_name'], repo.get('default_branch', 'master')) for repo in installed_repos]
+            # Process in background
+            executor.submit(install_repositories, repos, 'created')
             
             return "Installation event accepted for processing", 200
 
@@ -89,11 +102,9 @@ def api_git_msg():
             added_repos = data.get('repositories_added', [])
             logging.info(f"Number of repositories added: {len(added_repos)}")
             
-            for repo in added_repos:
-                repo_full_name = repo['full_name']
-                default_branch = repo.get('default_branch', 'master')
-                # Process in background
-                executor.submit(process_installation_event, repo_full_name, default_branch, 'added')
+            repos = [(repo['full_name'], repo.get('default_branch', 'master')) for repo in added_repos]
+            # Process in background
+            executor.submit(install_repositories, repos, 'added')
             
             return "Installation repositories added event accepted for processing", 200
 
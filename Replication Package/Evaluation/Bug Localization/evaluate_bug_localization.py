@@ -1,14 +1,30 @@
 import sys
 import os
+import argparse
+import asyncio
+import hashlib
+import pickle
+import sqlite3
+import threading
+import multiprocessing
+import numpy as np
 import pandas as pd
 import ast
+import contextlib
 import shutil
 import logging
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from tqdm import tqdm
 import time
 import json
 
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
 # Setup paths
 script_path = os.path.abspath(__file__)
 script_dir = os.path.dirname(script_path)
@@ -17,14 +33,18 @@ project_root = os.path.abspath(os.path.join(script_dir, '..', '..', '..'))
 insight_tool_path = os.path.join(project_root, "INSIGHT Tool")
 sys.path.append(insight_tool_path)
 
-# Configure logging
+# Configure logging: full detail goes to the log file, the console only shows
+# warnings and errors next to the progress bars
 log_file_path = os.path.join(script_dir, 'evaluation_log.txt')
+console_handler = logging.StreamHandler()
+console_handler.setLevel(logging.WARNING)
 logging.basicConfig(
     level=logging.INFO, 
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler(log_file_path, mode='w'),
-        logging.StreamHandler()
+        # Worker processes re-import this module; only the main run starts a fresh log
+        logging.FileHandler(log_file_path, mode='w' if __name__ == '__main__' else 'a'),
+        console_handler
     ]
 )
 logger = logging.getLogger(__name__)
@@ -34,7 +54,8 @@ from dotenv import load_dotenv
 load_dotenv(os.path.join(insight_tool_path, ".env"))
 
 try:
-    from Feature_Components.knowledgeBase import BugLocalization, IndexRepository, GetIndexStatus
+    from Feature_Components.knowledgeBase import IndexRepository, GetIndexStatus
+    from Feature_Components.KnowledgeBase.bug_localization import BugLocalization
     from Feature_Components.KnowledgeBase.indexer import RepositoryIndexer
     from config import Config
 except ImportError as e:
@@ -43,73 +64,493 @@ except ImportError as e:
 
 # Dataset and output paths
 DATASET_PATH = os.path.join(script_dir, '..', 'test_dataset.xlsx')
+DATASET_PARQUET_PATH = os.path.splitext(DATASET_PATH)[0] + '.parquet'
 RESULTS_FILE = os.path.join(script_dir, 'evaluation_results_bug_localization.xlsx')
+RESULTS_PARQUET_FILE = os.path.splitext(RESULTS_FILE)[0] + '.parquet'
 TEMP_REPO_DIR = os.path.join(project_root, 'temp_repos')
+LOCALIZE_CACHE_PATH = os.path.join(script_dir, '.eval_cache.sqlite')
+# Part of every cache key; bumped to drop entries that may hold LLM fallback results
+LOCALIZE_CACHE_VERSION = 2
+# xlsxwriter emits workbooks much faster than pandas' default openpyxl engine
+EXCEL_ENGINE = 'xlsxwriter' if xlsxwriter is not None else None
+# Per-issue results appended as they are computed; removed once the results are saved
+RESULTS_ROLLING_FILE = os.path.join(script_dir, 'evaluation_rolling.jsonl')
+
+# Metric columns of the detailed results, in output order
+RETRIEVER_K_VALUES = [1, 5, 10, 20, 30]
+LLM_K_VALUES = [1, 3, 5, 10]
+METRIC_GROUPS = [
+    ('Retriever', RETRIEVER_K_VALUES),      # Files, from retrieved candidates
+    ('LLM File', LLM_K_VALUES),
+    ('LLM Class', LLM_K_VALUES),
+    ('LLM Func', LLM_K_VALUES),
+    ('LLM FuncClass', LLM_K_VALUES),        # Functions and classes merged
+]
+GROUND_TRUTH_COLUMNS = ('Changed Files', 'Changed Classes', 'Changed Functions')
+METRIC_NAMES = ('Hit', 'Precision', 'Recall', 'F1', 'AllCorrect', 'AllIncorrect', 'AvgTP')
+COUNT_METRICS = ('Hit', 'AllCorrect', 'AllIncorrect', 'AvgTP')
+METRIC_COLUMNS = {}  # column name -> dtype
+for _prefix, _k_values in METRIC_GROUPS:
+    METRIC_COLUMNS[f'{_prefix} MAP'] = np.float64
+    for _k in _k_values:
+        for _name in METRIC_NAMES:
+            METRIC_COLUMNS[f'{_prefix} {_name}@{_k}'] = np.int64 if _name in COUNT_METRICS else np.float64
+METRIC_COLUMNS.update({
+    'Input Tokens': np.int64,
+    'Output Tokens': np.int64,
+    'Total Tokens': np.int64,
+    'Duration': np.float64,
+    # 1 when Duration is an equal share of a batch's wall time rather than measured per issue
+    'Duration Amortized': np.int64,
+})
+
+# Issues localized at once per repository (wall time is dominated by LLM round-trips)
+LOCALIZE_CONCURRENCY = int(os.getenv('EVAL_LOCALIZE_CONCURRENCY', 16))
+
+# Repositories cloned and indexed in parallel worker processes. Each worker loads
+# its own embedding model, so the default stays small regardless of core count
+PREPARE_WORKERS = int(os.getenv('EVAL_PREPARE_WORKERS', min(4, os.cpu_count() or 1)))
+
+def run_git(target_dir, *args):
+    """Run a git command in target_dir, raising CalledProcessError on failure"""
+    return subprocess.run(['git', '-C', target_dir, *args], check=True, capture_output=True, text=True)
+
+def _same_remote(url_a, url_b):
+    """Compare remote URLs ignoring a trailing slash or .git suffix"""
+    def normalize(url):
+        url = url.strip().rstrip('/')
+        return url[:-4] if url.endswith('.git') else url
+    return normalize(url_a) == normalize(url_b)
+
+def _clone_record_path(target_dir):
+    """Path of the record describing a clone made by this script (kept inside its .git)"""
+    return os.path.join(target_dir, '.git', 'eval_clone.json')
+
+def _write_clone_record(target_dir, repo_url):
+    """Record the remote and commit of a finished clone so later runs can skip git"""
+    try:
+        sha = run_git(target_dir, 'rev-parse', 'HEAD').stdout.strip()
+        with open(_clone_record_path(target_dir), 'w', encoding='utf-8') as f:
+            json.dump({'url': repo_url, 'sha': sha, 'ts': time.time()}, f)
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.warning(f"Could not write clone record for {target_dir}: {e}")
+
+def _read_clone_record(target_dir):
+    """Return the clone record of target_dir, or None if there is no valid one"""
+    try:
+        with open(_clone_record_path(target_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
 def clone_repo(repo_url, target_dir):
     """Clone a repository if it doesn't exist"""
+    # Clones made by a previous run are reused without spawning any git process
+    record = _read_clone_record(target_dir)
+    if record is not None and _same_remote(record.get('url', ''), repo_url):
+        logger.info(f"Repository {repo_url} already cloned at {target_dir} ({record.get('sha', '')[:12]})")
+        return True
+    
     if os.path.exists(target_dir):
-        # Check if it's a valid git repo
+        # Check if it's a valid git repo of its own (temp_repos lives inside this
+        # project's work tree, so a broken clone would otherwise resolve to it)
+        origin_url = None
         try:
-            result = subprocess.run(['git', '-C', target_dir, 'status'], capture_output=True, check=True)
+            toplevel = run_git(target_dir, 'rev-parse', '--show-toplevel').stdout.strip()
+            if os.path.realpath(toplevel) == os.path.realpath(target_dir):
+                origin_url = run_git(target_dir, 'remote', 'get-url', 'origin').stdout
+        except (subprocess.CalledProcessError, OSError):
+            pass
+        
+        if origin_url is not None and _same_remote(origin_url, repo_url):
             logger.info(f"Repository {repo_url} already exists at {target_dir}")
+            _write_clone_record(target_dir, repo_url)
             return True
-        except:
-            pass
+        
+        if origin_url is not None:
+            # Points at another remote: retarget the clone in place instead of re-cloning
+            logger.info(f"Retargeting {target_dir} from {origin_url.strip()} to {repo_url}")
+            try:
+                run_git(target_dir, 'remote', 'set-url', 'origin', repo_url)
+                # Same as a fresh clone: no background maintenance (clones made
+                # before gc.auto was set would otherwise still run it)
+                run_git(target_dir, 'config', 'gc.auto', '0')
+                run_git(target_dir, 'fetch', '--depth', '1', '--prune', 'origin', 'HEAD')
+                run_git(target_dir, 'reset', '--hard', 'FETCH_HEAD')
+                run_git(target_dir, 'clean', '-xfd')
+                _write_clone_record(target_dir, repo_url)
+                return True
+            except subprocess.CalledProcessError as e:
+                logger.warning(f"Could not retarget {target_dir}, cloning again: {e}")
+        
         logger.info(f"Removing existing directory {target_dir}")
         shutil.rmtree(target_dir, ignore_errors=True)
         
     logger.info(f"Cloning {repo_url} to {target_dir}...")
     try:
-        subprocess.run(['git', 'clone', repo_url, target_dir], check=True, capture_output=True)
+        # Only the current tree is indexed, so history is not needed; gc.auto=0
+        # keeps git from starting background maintenance during the evaluation
+        subprocess.run(
+            ['git', 'clone', '--depth', '1', '--filter=blob:none', '--single-branch',
+             '-c', 'gc.auto=0', repo_url, target_dir],
+            check=True, capture_output=True
+        )
+        _write_clone_record(target_dir, repo_url)
         return True
     except subprocess.CalledProcessError as e:
         logger.error(f"Failed to clone {repo_url}: {e}")
         return False
 
-        return False
+def load_dataset():
+    """Load the test dataset through a parquet copy, (re)built whenever the Excel file is newer"""
+    if (os.path.exists(DATASET_PARQUET_PATH)
+            and os.path.getmtime(DATASET_PARQUET_PATH) >= os.path.getmtime(DATASET_PATH)):
+        try:
+            return pd.read_parquet(DATASET_PARQUET_PATH)
+        except Exception as e:
+            logger.warning(f"Could not read dataset cache {DATASET_PARQUET_PATH}, using Excel: {e}")
+    
+    df = pd.read_excel(DATASET_PATH)
+    # The cache stores the ground-truth lists already parsed (as parquet list columns)
+    for column in GROUND_TRUTH_COLUMNS:
+        if column in df:
+            df[column] = df[column].map(parse_list)
+    try:
+        df.to_parquet(DATASET_PARQUET_PATH, index=False)
+    except ImportError:
+        logger.info("pyarrow/fastparquet not installed; the dataset is read from Excel on every run")
+    except Exception as e:
+        logger.warning(f"Could not write dataset cache {DATASET_PARQUET_PATH}: {e}")
+    return df
+
+def parse_list(value):
+    """Parse a ground-truth list cell; JSON-compatible lists skip the slower literal_eval"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, np.ndarray):
+        # List column read back from the parquet dataset cache
+        return value.tolist()
+    if not isinstance(value, str):
+        return []
+    if value.startswith('['):
+        try:
+            if '"' in value:
+                # Written by json.dumps (or a repr that happens to be valid JSON)
+                return json.loads(value)
+            if '\\' not in value:
+                # Older cells hold str(list): without '"' or '\\' the repr only differs from JSON in its quotes
+                return json.loads(value.replace("'", '"'))
+        except ValueError:
+            pass
+    try:
+        return ast.literal_eval(value)
+    except Exception:
+        return []
+
+def prepare_repo(repo_name, repo_url):
+    """Clone and index a repository; returns its local path, or None if it cannot be evaluated"""
+    # Prepare local path
+    repo_dir_name = repo_name.replace('/', '_')
+    repo_path = os.path.join(TEMP_REPO_DIR, repo_dir_name)
+    
+    # A failing repository is skipped; it must not abort the other workers' results
+    try:
+        # 1. Clone
+        if not clone_repo(repo_url, repo_path):
+            return None
+            
+        # 2. Index (Check if already indexed)
+        status = GetIndexStatus(repo_name)
+        
+        if status.get('indexed'):
+            logger.info(f"Repository {repo_name} is already indexed. Skipping indexing.")
+        else:
+            logger.info(f"Indexing {repo_name}...")
+            try:
+                index_result = IndexRepository(repo_path, repo_name)
+            except Exception as e:
+                index_result = {'success': False, 'error': str(e)}
+            if not index_result.get('success'):
+                logger.error(f"Indexing failed for {repo_name}: {index_result.get('error')}")
+                return None
+    except Exception as e:
+        logger.error(f"Preparing {repo_name} failed: {e}")
+        return None
+    
+    return repo_path
+
+def prepared_repo_path(repo_name, future):
+    """Result of a prepare_repo() future; None if its worker process (or the whole pool) died"""
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f"Preparing {repo_name} failed in its worker process: {e}")
+        return None
+
+def load_rolling_results():
+    """Result rows written by an interrupted run, keyed by issue URL"""
+    done_rows = {}
+    if not os.path.exists(RESULTS_ROLLING_FILE):
+        return done_rows
+    with open(RESULTS_ROLLING_FILE, encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Last line of a run killed mid-write
+                continue
+            done_rows[row['Issue URL']] = row
+    return done_rows
+
+def write_results_workbook(path, file_summary, func_class_summary, results_df):
+    """Write the summary tables and the detailed results to an Excel workbook"""
+    with pd.ExcelWriter(path, engine=EXCEL_ENGINE) as writer:
+        file_summary.to_excel(writer, sheet_name='File Level Metrics')
+        func_class_summary.to_excel(writer, sheet_name='Func_Class Level Metrics')
+        if EXCEL_ENGINE != 'xlsxwriter':
+            results_df.to_excel(writer, sheet_name='Detailed Results', index=False)
+            return
+        
+        # The detailed sheet is wide: write whole rows instead of going through
+        # pandas' per-cell formatter (header styled like pandas does)
+        worksheet = writer.book.add_worksheet('Detailed Results')
+        header_format = writer.book.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        worksheet.write_row(0, 0, results_df.columns, header_format)
+        for row_idx, row in enumerate(results_df.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_idx, 0, row)
+
+# --- Localization Cache ---
+
+class LocalizationCache:
+    """On-disk cache of localize() results so re-runs skip identical LLM calls"""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS localize (key TEXT PRIMARY KEY, value BLOB)")
+        self._conn.commit()
+        # One connection shared by the localization worker threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(bug_localization, issue_title, issue_body):
+        """Content hash of everything that determines a localization result"""
+        parts = [
+            LOCALIZE_CACHE_VERSION, bug_localization.llm_service.model_name, bug_localization.repo_name,
+            Config.RETRIEVER_TOP_K, Config.LLM_SELECTION_COUNT, Config.LLM_INPUT_LIMIT,
+            issue_title, issue_body
+        ]
+        return hashlib.sha256('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM localize WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        data = pickle.dumps(value)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO localize (key, value) VALUES (?, ?)", (key, data))
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def is_cacheable(result):
+    """Results built from an LLM fallback (rate limit, timeout, bad answer) are retried next run"""
+    return not result[2].get('fallback')
+
+def localize_cached(bug_localization, issue_title, issue_body, cache=None):
+    """Call localize(), serving and storing results through the cache when one is given"""
+    if cache is None:
+        return bug_localization.localize(issue_title, issue_body)
+    
+    key = LocalizationCache.make_key(bug_localization, issue_title, issue_body)
+    result = cache.get(key)
+    if result is None:
+        # Exceptions propagate uncached; fallback results are returned but not stored
+        result = bug_localization.localize(issue_title, issue_body)
+        if is_cacheable(result):
+            cache.set(key, result)
+    return result
+
+# --- Concurrent Localization ---
+
+async def localize_async(bug_localization, issue_title, issue_body, issue_url, semaphore, pbar, cache=None):
+    """Run the blocking localize() in a worker thread, at most LOCALIZE_CONCURRENCY at a time"""
+    async with semaphore:
+        start_time = time.time()
+        try:
+            selected_funcs, all_candidates, token_usage = await asyncio.to_thread(
+                localize_cached, bug_localization, issue_title, issue_body, cache
+            )
+        except Exception as e:
+            logger.error(f"Error localizing issue {issue_url}: {e}")
+            selected_funcs, all_candidates, token_usage = [], [], {}
+        duration = time.time() - start_time
+        pbar.update(1)
+        return selected_funcs, all_candidates, token_usage, duration, False
+
+async def localize_all(bug_localization, issues, repo_name, cache=None):
+    """Localize (title, body, url) issues concurrently; results are returned in input order"""
+    semaphore = asyncio.Semaphore(LOCALIZE_CONCURRENCY)
+    with tqdm(total=len(issues), desc=f"Evaluating {repo_name}") as pbar:
+        return await asyncio.gather(
+            *(localize_async(bug_localization, title, body, url, semaphore, pbar, cache)
+              for title, body, url in issues),
+            return_exceptions=True
+        )
+
+# --- Batched Localization ---
+
+def localize_batch_cached(bug_localization, issues, repo_name, cache=None):
+    """Localize (title, body, url) issues with batched LLM calls; cached results are not re-sent"""
+    results = [None] * len(issues)
+    keys = [None] * len(issues)
+    misses = []
+    
+    with tqdm(total=len(issues), desc=f"Evaluating {repo_name}") as pbar:
+        for i, (title, body, _) in enumerate(issues):
+            start_time = time.time()
+            cached = None
+            if cache is not None:
+                keys[i] = LocalizationCache.make_key(bug_localization, title, body)
+                cached = cache.get(keys[i])
+            if cached is None:
+                misses.append(i)
+            else:
+                results[i] = (*cached, time.time() - start_time, False)
+                pbar.update(1)
+        
+        if misses:
+            start_time = time.time()
+            batch = bug_localization.localize_batch(
+                [issues[i][:2] for i in misses], max_concurrency=LOCALIZE_CONCURRENCY
+            )
+            # A batch has no per-issue timing; each issue is charged an equal share,
+            # flagged as amortized in the results
+            duration = (time.time() - start_time) / len(misses)
+            for i, result in zip(misses, batch):
+                if isinstance(result, BaseException):
+                    results[i] = result
+                else:
+                    # Exceptions and fallback results are not cached
+                    if cache is not None and is_cacheable(result):
+                        cache.set(keys[i], result)
+                    results[i] = (*result, duration, True)
+            pbar.update(len(misses))
+    
+    return results
 
 # --- Metrics Calculation Helper Functions ---
 
+# The same candidate and ground-truth paths recur across issues of a repository
+normpath = lru_cache(maxsize=16384)(os.path.normpath)
+
+# Trie node keys that cannot collide with a single path character
+_TRIE_END = '<end>'
+_TRIE_BELOW = '<below>'
+
+def build_suffix_trie(paths):
+    """Trie over the reversed characters of paths; each node also keeps every path ending in its suffix"""
+    root = {_TRIE_BELOW: set(paths)}
+    for path in paths:
+        node = root
+        for char in reversed(path):
+            node = node.setdefault(char, {_TRIE_BELOW: set()})
+            node[_TRIE_BELOW].add(path)
+        node[_TRIE_END] = path
+    return root
+
+def match_suffix_trie(trie, pred):
+    """Paths p in the trie with p.endswith(pred) or pred.endswith(p), in O(len(pred))"""
+    matched = set()
+    node = trie
+    for char in reversed(pred):
+        # A path ends here: it is a suffix of pred
+        if _TRIE_END in node:
+            matched.add(node[_TRIE_END])
+        node = node.get(char)
+        if node is None:
+            return matched
+    # pred fully consumed: it is a suffix of every path below
+    matched |= node[_TRIE_BELOW]
+    return matched
+
+def _match_predictions(predictions, norm_gt):
+    """Normalize each prediction and collect the ground-truth paths it suffix-matches"""
+    trie = build_suffix_trie(norm_gt)
+    # Most correct predictions equal a ground-truth path exactly: resolve those with
+    # one hash lookup (the stored set still includes any other suffix matches)
+    exact = {path: match_suffix_trie(trie, path) for path in norm_gt}
+    matches = []
+    for pred in predictions:
+        norm_pred = normpath(pred)
+        matched = exact.get(norm_pred)
+        if matched is None:
+            matched = match_suffix_trie(trie, norm_pred)
+        matches.append((norm_pred, matched))
+    return matches
+
 def calculate_metrics_at_k(predictions, ground_truth, k_values):
+    norm_gt = {normpath(f) for f in ground_truth}
+    return _metrics_from_matches(_match_predictions(predictions[:max(k_values)], norm_gt), norm_gt, k_values)
+
+def calculate_ap(predictions, ground_truth):
+    norm_gt = {normpath(f) for f in ground_truth}
+    if not norm_gt:
+        return 0.0
+    return _ap_from_matches(_match_predictions(predictions, norm_gt), norm_gt)
+
+def calculate_metrics_and_ap(predictions, ground_truth, k_values):
+    """calculate_metrics_at_k and calculate_ap from a single matching pass over the predictions"""
+    norm_gt = {normpath(f) for f in ground_truth}
+    matches = _match_predictions(predictions, norm_gt)
+    ap = _ap_from_matches(matches, norm_gt) if norm_gt else 0.0
+    return _metrics_from_matches(matches[:max(k_values)], norm_gt, k_values), ap
+
+def _metrics_from_matches(matches, norm_gt, k_values):
     metrics = {}
-    norm_gt = {os.path.normpath(f) for f in ground_truth}
+    
+    # Walk the longest prefix once; running totals give every k in O(1)
+    cum_tp = []     # distinct correct predictions among the first i+1
+    cum_found = []  # distinct GT items covered by the first i+1
+    seen_preds = set()
+    found_gt = set()
+    tp = 0
+    for norm_pred, matched in matches:
+        # A prediction repeated (after normalization) is only counted once
+        if norm_pred not in seen_preds:
+            seen_preds.add(norm_pred)
+            if matched:
+                tp += 1
+                found_gt |= matched
+        cum_tp.append(tp)
+        cum_found.append(len(found_gt))
     
     for k in k_values:
         # Top-k predictions
-        top_k_preds = predictions[:k]
-        norm_preds = {os.path.normpath(f) for f in top_k_preds}
+        n_preds = min(k, len(cum_tp))
         
-        # True Positives & Coverage
-        tp = 0
-        found_gt = set()
-        
-        for pred in norm_preds:
-            # Check against all GT items
-            for gt in norm_gt:
-                if gt.endswith(pred) or pred.endswith(gt):
-                    # It's a match
-                    found_gt.add(gt)
-                    # We only count this prediction as a TP once even if it matches multiple GTs (unlikely but possible with loose matching)
-                    # However, strictly TP usually counts distinct correct PREDICTIONS.
-                    # Let's keep TP as count of "correct predictions" for Precision calculation.
-            
-            # If this prediction matched ANY GT, it's a true positive
-            if any(gt.endswith(pred) or pred.endswith(gt) for gt in norm_gt):
-                tp += 1
+        # True Positives (correct predictions) & Coverage (GT items found)
+        tp = cum_tp[n_preds - 1] if n_preds else 0
+        n_found = cum_found[n_preds - 1] if n_preds else 0
         
         # Hit@k (Is at least one correct?)
-        hit = 1 if len(found_gt) > 0 else 0
+        hit = 1 if n_found > 0 else 0
         
         # Recall@k (Coverage of GT)
         # Recall is defined as (Relevant Retrieved) / (Total Relevant)
-        # In this context, it should be len(found_gt) / len(norm_gt)
-        recall = len(found_gt) / len(norm_gt) if norm_gt else 0
+        recall = n_found / len(norm_gt) if norm_gt else 0
 
         # Precision@k
         # Corrected: Use actual number of predictions as denominator to avoid penalizing concise answers
-        denom = len(top_k_preds)
-        precision = tp / denom if denom > 0 else 0
+        precision = tp / n_preds if n_preds > 0 else 0
         
         # If 50% or more of the ground truth remain in the predicted sets, the precision should be one.
         if recall >= 0.5:
@@ -119,7 +560,7 @@ def calculate_metrics_at_k(predictions, ground_truth, k_values):
         f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
 
         # All Correct@k (Did we find ALL ground truth items?)
-        all_correct = 1 if (norm_gt and len(found_gt) == len(norm_gt)) else 0
+        all_correct = 1 if (norm_gt and n_found == len(norm_gt)) else 0
 
         # All Incorrect@k
         all_incorrect = 1 if tp == 0 else 0
@@ -134,278 +575,249 @@ def calculate_metrics_at_k(predictions, ground_truth, k_values):
     
     return metrics
 
-def calculate_ap(predictions, ground_truth):
-    norm_gt = {os.path.normpath(f) for f in ground_truth}
+def _ap_from_matches(matches, norm_gt):
     hits = 0
     sum_precisions = 0
     
-    for i, pred in enumerate(predictions):
-        norm_pred = os.path.normpath(pred)
-        if any(gt.endswith(norm_pred) or norm_pred.endswith(gt) for gt in norm_gt):
+    for i, (_, matched) in enumerate(matches):
+        if matched:
             hits += 1
             precision_at_i = hits / (i + 1)
             sum_precisions += precision_at_i
-            
-    if not norm_gt:
-        return 0.0
     
     return sum_precisions / len(norm_gt)
 
-def evaluate():
+def evaluate(use_cache=True, use_batch=True, prepare_workers=PREPARE_WORKERS, resume=True):
     if not os.path.exists(DATASET_PATH):
         logger.error(f"Dataset not found at {DATASET_PATH}")
         return
 
-    df = pd.read_excel(DATASET_PATH)
+    df = load_dataset()
     logger.info(f"Loaded {len(df)} issues from dataset.")
 
-    results = []
+    # Parse the ground-truth list columns once instead of per issue inside the loop
+    for column in GROUND_TRUTH_COLUMNS:
+        df[column] = df[column].map(parse_list) if column in df else [[] for _ in range(len(df))]
+
+    # Per-issue results, filled in place: one preallocated array per metric column
+    row_meta = {'Repository': [], 'Issue URL': [], 'Model': []}
+    metrics_buf = {name: np.zeros(len(df), dtype=dtype) for name, dtype in METRIC_COLUMNS.items()}
+    n_rows = 0
     
-    # Group by repository to minimize cloning/indexing
-    repos = df['Repository'].unique()
+    # Resume an interrupted run: issues already in the rolling file are not evaluated again
+    done_rows = {}
+    if resume:
+        dataset_urls = set(df['Issue URL'])
+        done_rows = {url: row for url, row in load_rolling_results().items() if url in dataset_urls}
+    if done_rows:
+        logger.info(f"Resuming: {len(done_rows)} issues already evaluated in {RESULTS_ROLLING_FILE}")
+        for row in done_rows.values():
+            for col, values in row_meta.items():
+                values.append(row[col])
+            for name, values in metrics_buf.items():
+                # Rolling files written before a column was added default to 0
+                values[n_rows] = row.get(name, 0)
+            n_rows += 1
+        pending_df = df[~df['Issue URL'].isin(list(done_rows))]
+    else:
+        pending_df = df
     
-    for repo_name in repos:
-        repo_issues = df[df['Repository'] == repo_name]
-        
-        repo_url = repo_issues.iloc[0]['Repo Link']
-        
-        # Prepare local path
-        repo_dir_name = repo_name.replace('/', '_')
-        repo_path = os.path.join(TEMP_REPO_DIR, repo_dir_name)
+    # Group by repository to minimize cloning/indexing (one pass, first-seen order)
+    repo_groups = list(pending_df.groupby('Repository', sort=False))
+    repos = [repo_name for repo_name, _ in repo_groups]
+    repo_urls = [repo_issues.iloc[0]['Repo Link'] for _, repo_issues in repo_groups]
+    
+    # 1-2. Clone and index all repositories in parallel. Spawned (not forked)
+    # workers, so no CUDA/driver state is inherited from this process.
+    # The pool, rolling file and cache are closed even if evaluation fails midway
+    with ProcessPoolExecutor(max_workers=max(1, min(len(repos), prepare_workers)),
+                             mp_context=multiprocessing.get_context('spawn')) as executor, \
+            open(RESULTS_ROLLING_FILE, 'a' if done_rows else 'w', encoding='utf-8') as rolling, \
+            (LocalizationCache(LOCALIZE_CACHE_PATH) if use_cache else contextlib.nullcontext()) as cache:
+        # Paths are collected in repository order as soon as each one is ready, so the
+        # first repositories are evaluated while later ones are still being indexed
+        futures = [executor.submit(prepare_repo, repo_name, repo_url)
+                   for repo_name, repo_url in zip(repos, repo_urls)]
         
-        # 1. Clone
-        if not clone_repo(repo_url, repo_path):
-            continue
-            
-        # 2. Index (Check if already indexed)
-        status = GetIndexStatus(repo_name)
+        llm_service = None  # LLM client created with the first repository, then shared
         
-        if status.get('indexed'):
-            logger.info(f"Repository {repo_name} is already indexed. Skipping indexing.")
-        else:
-            logger.info(f"Indexing {repo_name}...")
-            try:
-                index_result = IndexRepository(repo_path, repo_name)
-            finally:
-                if not index_result.get('success'):
-                    logger.error(f"Indexing failed for {repo_name}: {index_result.get('error')}")
-                    continue
-            
-        # Initialize BugLocalization
-        from Feature_Components.KnowledgeBase.bug_localization import BugLocalization
-        bug_localization = BugLocalization(repo_name, repo_path)
-
-        # 3. Evaluate Issues
-        for idx, row in tqdm(repo_issues.iterrows(), total=len(repo_issues), desc=f"Evaluating {repo_name}"):
-            
-            issue_title = row['Issue Title']
-            issue_body = row['Issue Description']
-            
-            # Ground Truth
-            try:
-                gt_files = ast.literal_eval(row['Changed Files'])
-            except:
-                gt_files = []
+        # Issues are evaluated in this process, one repository at a time
+        for (repo_name, repo_issues), future in zip(repo_groups, futures):
+            repo_path = prepared_repo_path(repo_name, future)
+            if repo_path is None:
+                continue
             
-            try:
-                gt_classes = ast.literal_eval(row['Changed Classes']) if 'Changed Classes' in row else []
-            except:
-                gt_classes = []
-                
-            try:
-                gt_funcs = ast.literal_eval(row['Changed Functions'])
-            except:
-                gt_funcs = []
+            # Initialize BugLocalization
+            bug_localization = BugLocalization(repo_name, repo_path, llm_service=llm_service)
+            llm_service = bug_localization.llm_service
+
+            # Pull the needed columns out once instead of boxing every row into a Series
+            issues = list(zip(
+                repo_issues['Issue Title'].to_numpy(),
+                repo_issues['Issue Description'].to_numpy(),
+                repo_issues['Issue URL'].to_numpy()
+            ))
+            changed_files = repo_issues['Changed Files'].to_numpy()
+            changed_classes = repo_issues['Changed Classes'].to_numpy()
+            changed_funcs = repo_issues['Changed Functions'].to_numpy()
+
+            # 3. Localize all issues of the repository: LLM prompts sent as batches,
+            # or one concurrent localize() call per issue
+            if use_batch:
+                localizations = localize_batch_cached(bug_localization, issues, repo_name, cache)
+            else:
+                localizations = asyncio.run(localize_all(bug_localization, issues, repo_name, cache))
+
+            # 4. Evaluate Issues
+            for issue_idx, ((issue_title, issue_body, issue_url), gt_files, gt_classes, gt_funcs, localization) in enumerate(zip(
+                    issues, changed_files, changed_classes, changed_funcs, localizations)):
+                # Drop the list's reference so each issue's candidates are freed once evaluated
+                localizations[issue_idx] = None
                 
-            # Run Localization
-            start_time = time.time()
+                # Localization Result
+                if isinstance(localization, BaseException):
+                    logger.error(f"Error localizing issue {issue_url}: {localization}")
+                    selected_funcs, all_candidates, token_usage, duration, amortized = [], [], {}, 0.0, False
+                else:
+                    selected_funcs, all_candidates, token_usage, duration, amortized = localization
             
-            try:
-                selected_funcs, all_candidates, token_usage = bug_localization.localize(issue_title, issue_body)
-            except Exception as e:
-                logger.error(f"Error localizing issue {row['Issue URL']}: {e}")
-                selected_funcs = []
-                all_candidates = []
-                token_usage = {}
+                # Extract Predictions (Top K only) for logging and metrics,
+                # deduplicated in rank order (dicts keep insertion order)
+                top_selected = selected_funcs[:Config.LLM_SELECTION_COUNT]
+                pred_files = list(dict.fromkeys(res['file_path'] for res in top_selected))
+                pred_funcs = list(dict.fromkeys(res['name'] for res in top_selected))
             
-            duration = time.time() - start_time
+                # Classes (from entity_type or class_name)
+                class_names = (res.get('name') if res.get('entity_type') == 'class' else res.get('class_name')
+                               for res in top_selected)
+                pred_classes = list(dict.fromkeys(cname for cname in class_names if cname))
             
-            # Extract Predictions (Top K only) for logging and metrics
-            pred_files = []
-            pred_funcs = []
-            pred_classes = []
-            
-            seen_files = set()
-            seen_funcs = set()
-            seen_classes = set()
+                # 1. Retrieval Stage (Candidates)
+                retrieved_files = list(dict.fromkeys(cand['file_path'] for cand in all_candidates if cand.get('file_path')))
+
+                # DEBUG: Print comparison (collected and written as one record per issue).
+                # Only built with --verbose, the strings are large and discarded otherwise
+                if logger.isEnabledFor(logging.DEBUG):
+                    issue_log = [
+                        f"\n--- Issue: {issue_title} ---",
+                        f"GT Files: {gt_files}",
+                        f"Pred Files: {pred_files}",
+                        f"GT Classes: {gt_classes}",
+                        f"Pred Classes: {pred_classes}",
+                        f"GT Funcs: {gt_funcs}",
+                        f"Pred Funcs: {pred_funcs}",
+                    ]
+
+                    # Debug sets for GT presence check
+                    retrieved_classes = {cand['class_name'] for cand in all_candidates if cand.get('class_name')}
+                    retrieved_funcs = {cand['name'] for cand in all_candidates if cand.get('name')}
+
+                    # Debug: Check if GT is in Retrieved Candidates
+                    issue_log.append(f"--- Retrieval Debug (Top-{Config.RETRIEVER_TOP_K}) ---")
 
-            if selected_funcs:
-                for res in selected_funcs[:Config.LLM_SELECTION_COUNT]:  
                     # Files
-                    fpath = res['file_path']
-                    if fpath not in seen_files:
-                        pred_files.append(fpath)
-                        seen_files.add(fpath)
-
-                    # Functions
-                    fname = res['name']
-                    if fname not in seen_funcs:
-                        pred_funcs.append(fname)
-                        seen_funcs.add(fname)
-                    
-                    # Classes (from entity_type or class_name)
-                    cname = None
-                    if res.get('entity_type') == 'class':
-                        cname = res.get('name')
-                    elif res.get('class_name'):
-                        cname = res.get('class_name')
-                    
-                    if cname and cname not in seen_classes:
-                        pred_classes.append(cname)
-                        seen_classes.add(cname)
+                    found_files = [f for f in gt_files if any(r.endswith(f) or f.endswith(r) for r in retrieved_files)]
+                    missing_files = set(gt_files) - set(found_files)
+                    issue_log.append(f"GT Files Found in Retrieval: {len(found_files)}/{len(gt_files)} -> {found_files}")
+                    if missing_files:
+                        issue_log.append(f"GT Files MISSING in Retrieval: {missing_files}")
+
+                    # Classes
+                    found_classes = [c for c in gt_classes if c in retrieved_classes]
+                    issue_log.append(f"GT Classes Found in Retrieval: {len(found_classes)}/{len(gt_classes)} -> {found_classes}")
+
+                    # Funcs
+                    found_funcs = [f for f in gt_funcs if f in retrieved_funcs]
+                    issue_log.append(f"GT Functions Found in Retrieval: {len(found_funcs)}/{len(gt_funcs)} -> {found_funcs}")
+
+                    # Classes in LLM Input
+                    llm_input_classes = {item['class_name'] for item in selected_funcs if item.get('class_name')}
+                    issue_log.append("--- LLM Input Debug ---")
+                    input_classes = [c for c in gt_classes if c in llm_input_classes]
+                    issue_log.append(f"GT Classes in LLM Input: {len(input_classes)}/{len(gt_classes)} -> {input_classes}")
+                    logger.debug("\n".join(issue_log))
+
+                # Assign to variables expected by metric calc
+                # but original code used selected_files, selected_funcs_names, selected_class_names)
+                selected_files = pred_files
+                selected_funcs_names = pred_funcs
+                selected_class_names = pred_classes
+
+                # Calculate Metrics
             
-            # DEBUG: Print comparison
-            logger.info(f"\n--- Issue: {issue_title} ---")
-            logger.info(f"GT Files: {gt_files}")
-            logger.info(f"Pred Files: {pred_files}")
-            logger.info(f"GT Classes: {gt_classes}")
-            logger.info(f"Pred Classes: {pred_classes}")
-            logger.info(f"GT Funcs: {gt_funcs}")
-            logger.info(f"Pred Funcs: {pred_funcs}")
-
-            # 1. Retrieval Stage (Candidates)
-            retrieved_files = []
-            seen_cand_files = set()
+                # Retriever Metrics (Files)
+                retriever_metrics, retriever_map = calculate_metrics_and_ap(retrieved_files, gt_files, RETRIEVER_K_VALUES)
             
-            # Debug sets for GT presence check
-            retrieved_classes = set()
-            retrieved_funcs = set()
-
-            for cand in all_candidates:
-                fpath = cand.get('file_path')
-                if fpath:
-                    if fpath not in seen_cand_files:
-                        retrieved_files.append(fpath)
-                        seen_cand_files.add(fpath)
-                
-                # Collect Class/Func for debug
-                if cand.get('class_name'):
-                    retrieved_classes.add(cand['class_name'])
-                if cand.get('name'):
-                    retrieved_funcs.add(cand['name'])
-
-            # Debug: Check if GT is in Retrieved Candidates
-            logger.info(f"--- Retrieval Debug (Top-{Config.RETRIEVER_TOP_K}) ---")
-            
-            # Files
-            found_files = [f for f in gt_files if any(r.endswith(f) or f.endswith(r) for r in retrieved_files)]
-            missing_files = set(gt_files) - set(found_files) 
-            logger.info(f"GT Files Found in Retrieval: {len(found_files)}/{len(gt_files)} -> {found_files}")
-            if missing_files:
-                 logger.info(f"GT Files MISSING in Retrieval: {missing_files}")
-
-            # Classes
-            found_classes = [c for c in gt_classes if c in retrieved_classes]
-            logger.info(f"GT Classes Found in Retrieval: {len(found_classes)}/{len(gt_classes)} -> {found_classes}")
-
-            # Funcs
-            found_funcs = [f for f in gt_funcs if f in retrieved_funcs]
-            logger.info(f"GT Functions Found in Retrieval: {len(found_funcs)}/{len(gt_funcs)} -> {found_funcs}")
-
-            llm_input_files = set()
-            llm_input_classes = set()
-            llm_input_funcs = set()
-            
-            for item in selected_funcs:
-                 fpath = item.get('file_path')
-                 if fpath: llm_input_files.add(fpath)
-                 if item.get('class_name'): llm_input_classes.add(item['class_name'])
-                 if item.get('name'): llm_input_funcs.add(item['name'])
-
-            logger.info(f"--- LLM Input Debug ---")
-            # Classes in LLM Input
-            input_classes = [c for c in gt_classes if c in llm_input_classes]
-            logger.info(f"GT Classes in LLM Input: {len(input_classes)}/{len(gt_classes)} -> {input_classes}")
-
-            # Assign to variables expected by metric calc
-            # but original code used selected_files, selected_funcs_names, selected_class_names)
-            selected_files = pred_files
-            selected_funcs_names = pred_funcs
-            selected_class_names = pred_classes
-
-            # Calculate Metrics
-            k_values = [1, 5, 10, 20, 30]
-            
-            # Retriever Metrics (Files)
-            retriever_metrics = calculate_metrics_at_k(retrieved_files, gt_files, k_values)
-            retriever_map = calculate_ap(retrieved_files, gt_files)
-            
-            # LLM Metrics (Files) - k=[1, 3, 5, 10]
-            llm_metrics = calculate_metrics_at_k(selected_files, gt_files, [1, 3, 5, 10])
-            llm_map = calculate_ap(selected_files, gt_files)
+                # LLM Metrics (Files) - k=[1, 3, 5, 10]
+                llm_metrics, llm_map = calculate_metrics_and_ap(selected_files, gt_files, LLM_K_VALUES)
 
-            # LLM Metrics (Classes) - k=[1, 3, 5, 10]
-            llm_class_metrics = calculate_metrics_at_k(selected_class_names, gt_classes, [1, 3, 5, 10])
-            llm_class_map = calculate_ap(selected_class_names, gt_classes)
+                # LLM Metrics (Classes) - k=[1, 3, 5, 10]
+                llm_class_metrics, llm_class_map = calculate_metrics_and_ap(selected_class_names, gt_classes, LLM_K_VALUES)
 
-            # LLM Metrics (Functions) - k=[1, 3, 5, 10]
-            llm_func_metrics = calculate_metrics_at_k(selected_funcs_names, gt_funcs, [1, 3, 5, 10])
-            llm_func_map = calculate_ap(selected_funcs_names, gt_funcs)
+                # LLM Metrics (Functions) - k=[1, 3, 5, 10]
+                llm_func_metrics, llm_func_map = calculate_metrics_and_ap(selected_funcs_names, gt_funcs, LLM_K_VALUES)
             
-            # LLM Metrics (Function/Class Combined) - k=[1, 3, 5, 10]
-            gt_func_class = list(set(gt_classes + gt_funcs))
-            pred_func_class = []
-            pred_func_class = selected_funcs_names + selected_class_names
+                # LLM Metrics (Function/Class Combined) - k=[1, 3, 5, 10]
+                # A class selected as an entity is both a function and a class
+                # prediction; count it once, keeping the ranking order
+                gt_func_class = list(dict.fromkeys(gt_classes + gt_funcs))
+                pred_func_class = list(dict.fromkeys(selected_funcs_names + selected_class_names))
             
-            llm_func_class_metrics = calculate_metrics_at_k(pred_func_class, gt_func_class, [1, 3, 5, 10])
-            llm_func_class_map = calculate_ap(pred_func_class, gt_func_class)
-
-            # Combine Results
-            result_row = {
-                'Repository': repo_name,
-                'Issue URL': row['Issue URL'],
-                'Model': bug_localization.llm_service.model_name,
-                
-                # Retriever Metrics
-                'Retriever MAP': retriever_map,
-                **{f'Retriever {k}': v for k, v in retriever_metrics.items()},
-                
-                # LLM Metrics (Files)
-                'LLM File MAP': llm_map,
-                **{f'LLM File {k}': v for k, v in llm_metrics.items()},
-
-                # LLM Metrics (Classes)
-                'LLM Class MAP': llm_class_map,
-                **{f'LLM Class {k}': v for k, v in llm_class_metrics.items()},
+                llm_func_class_metrics, llm_func_class_map = calculate_metrics_and_ap(pred_func_class, gt_func_class, LLM_K_VALUES)
 
-                # LLM Metrics (Functions)
-                'LLM Func MAP': llm_func_map,
-                **{f'LLM Func {k}': v for k, v in llm_func_metrics.items()},
-                
-                # LLM Metrics (Func/Class Merged)
-                'LLM FuncClass MAP': llm_func_class_map,
-                **{f'LLM FuncClass {k}': v for k, v in llm_func_class_metrics.items()},
-                
-                'Input Tokens': token_usage.get('input_tokens', token_usage.get('prompt_tokens', 0)) if token_usage else 0,
-                'Output Tokens': token_usage.get('output_tokens', token_usage.get('completion_tokens', 0)) if token_usage else 0,
-                'Total Tokens': token_usage.get('total_tokens', 0) if token_usage else 0,
-                'Duration': duration
-            }
-            results.append(result_row)
+                # Store Results
+                row_meta['Repository'].append(repo_name)
+                row_meta['Issue URL'].append(issue_url)
+                row_meta['Model'].append(bug_localization.llm_service.model_name)
+            
+                for prefix, metrics, ap in (
+                    ('Retriever', retriever_metrics, retriever_map),
+                    ('LLM File', llm_metrics, llm_map),
+                    ('LLM Class', llm_class_metrics, llm_class_map),
+                    ('LLM Func', llm_func_metrics, llm_func_map),
+                    ('LLM FuncClass', llm_func_class_metrics, llm_func_class_map),
+                ):
+                    metrics_buf[f'{prefix} MAP'][n_rows] = ap
+                    for name, value in metrics.items():
+                        metrics_buf[f'{prefix} {name}'][n_rows] = value
+            
+                if token_usage:
+                    metrics_buf['Input Tokens'][n_rows] = token_usage.get('input_tokens', token_usage.get('prompt_tokens', 0))
+                    metrics_buf['Output Tokens'][n_rows] = token_usage.get('output_tokens', token_usage.get('completion_tokens', 0))
+                    metrics_buf['Total Tokens'][n_rows] = token_usage.get('total_tokens', 0)
+                metrics_buf['Duration'][n_rows] = duration
+                metrics_buf['Duration Amortized'][n_rows] = amortized
             
+                # Persist the row right away so a crash does not lose finished issues
+                rolling.write(json.dumps({
+                    **{col: values[-1] for col, values in row_meta.items()},
+                    **{name: values[n_rows].item() for name, values in metrics_buf.items()}
+                }) + '\n')
+                rolling.flush()
+                n_rows += 1
+    
     # Calculate Overall Metrics
-    if not results:
+    if n_rows == 0:
         logger.error("No results generated.")
         return
 
-    results_df = pd.DataFrame(results)
+    # Issues of repositories that failed to clone/index leave the tail unused
+    results_df = pd.DataFrame({
+        **row_meta,
+        **{name: values[:n_rows] for name, values in metrics_buf.items()}
+    })
+    if done_rows:
+        # Resumed rows were loaded first; restore dataset order
+        position = {url: i for i, url in enumerate(df['Issue URL'])}
+        order = np.argsort([position[url] for url in results_df['Issue URL']], kind='stable')
+        results_df = results_df.iloc[order].reset_index(drop=True)
     
-    def create_summary_table(df, prefix):
+    def summary_columns(prefix):
         # prefix is 'LLM File' or 'LLM FuncClass'
         # We want Hit@1, 3, 5, Overall Precision, Recall, All Correct, All Incorrect
         # Using k=5 for Precision/Recall/Correctness as a representative "Top-N" metric unless otherwise specified
         selected_k = 5
-        cols = {
+        return {
             f'{prefix} Hit@1': 'Hit@1',
             f'{prefix} Hit@3': 'Hit@3',
             f'{prefix} Hit@5': 'Hit@5',
@@ -414,45 +826,60 @@ def evaluate():
             f'{prefix} AllCorrect@{selected_k}': f'All Correct@{selected_k}',
             f'{prefix} AllIncorrect@{selected_k}': f'All Incorrect@{selected_k}'
         }
+
+    summary_prefixes = ('LLM File', 'LLM FuncClass')
+    all_summary_cols = [col for prefix in summary_prefixes for col in summary_columns(prefix)]
+
+    # One aggregation for every summary table: group by Repository and mean,
+    # plus the Total row (mean across ALL issues, not mean of means)
+    repo_means = results_df.groupby('Repository')[all_summary_cols].mean()
+    total_means = results_df[all_summary_cols].mean()
+
+    def create_summary_table(prefix):
+        cols = summary_columns(prefix)
+        summary = repo_means[list(cols)]
+        summary.columns = list(cols.values())
         
-        # Group by Repository and mean
-        summary = df.groupby('Repository')[list(cols.keys())].mean()
-        summary.columns = [cols[c] for c in summary.columns]
-        
-        # Calculate Total Row (Mean across ALL issues, not mean of means)
-        total_values = df[list(cols.keys())].mean()
         # Create a DataFrame for total to append properly
-        total_row = pd.DataFrame([total_values.values], columns=summary.columns, index=['Total'])
+        total_row = pd.DataFrame([total_means[list(cols)].values], columns=summary.columns, index=['Total'])
         
-        summary = pd.concat([summary, total_row])
-        return summary
+        return pd.concat([summary, total_row])
 
-    file_summary = create_summary_table(results_df, 'LLM File')
-    func_class_summary = create_summary_table(results_df, 'LLM FuncClass')
+    file_summary, func_class_summary = (create_summary_table(prefix) for prefix in summary_prefixes)
 
     logger.info("Generated Summary tables.")
 
+    # Columnar copy of the detailed results for further analysis (fast to load)
     try:
-        with pd.ExcelWriter(RESULTS_FILE) as writer:
-            file_summary.to_excel(writer, sheet_name='File Level Metrics')
-            func_class_summary.to_excel(writer, sheet_name='Func_Class Level Metrics')
-            results_df.to_excel(writer, sheet_name='Detailed Results', index=False)
+        results_df.to_parquet(RESULTS_PARQUET_FILE, index=False)
+        logger.info(f"Saved detailed results to {RESULTS_PARQUET_FILE}")
+    except ImportError:
+        logger.info("pyarrow/fastparquet not installed; skipping parquet results")
+    except Exception as e:
+        logger.error(f"Failed to save parquet results: {e}")
+
+    saved = False
+    try:
+        write_results_workbook(RESULTS_FILE, file_summary, func_class_summary, results_df)
         logger.info(f"Saved results to {RESULTS_FILE}")
+        saved = True
     except PermissionError:
         logger.error(f"Permission denied when writing to {RESULTS_FILE}. The file might be open.")
         backup_file = RESULTS_FILE.replace('.xlsx', f'_backup_{int(time.time())}.xlsx')
         logger.info(f"Attempting to save to backup file: {backup_file}")
         try:
-            with pd.ExcelWriter(backup_file) as writer:
-                file_summary.to_excel(writer, sheet_name='File Level Metrics')
-                func_class_summary.to_excel(writer, sheet_name='Func_Class Level Metrics')
-                results_df.to_excel(writer, sheet_name='Detailed Results', index=False)
+            write_results_workbook(backup_file, file_summary, func_class_summary, results_df)
             logger.info(f"Results successfully saved to backup file: {backup_file}")
+            saved = True
         except Exception as e:
             logger.error(f"Failed to save backup file: {e}")
     except Exception as e:
         logger.error(f"Failed to save results: {e}")
     
+    # The run is complete; the next one starts from scratch
+    if saved:
+        os.remove(RESULTS_ROLLING_FILE)
+    
     print("\n" + "="*60)
     print(f"LCA BENCHMARK RESULTS")
     print("="*60)
@@ -464,6 +891,23 @@ def evaluate():
     print("="*60)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate INSIGHT bug localization on the test dataset")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Ignore cached localization results and re-run every LLM call")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Discard the rolling results of an interrupted run and evaluate every issue again")
+    parser.add_argument('--no-batch', action='store_true',
+                        help="Localize issues one by one instead of batching each repository's LLM prompts")
+    parser.add_argument('--prepare-workers', type=int, default=PREPARE_WORKERS,
+                        help="Worker processes that clone and index repositories in parallel "
+                             "(each loads its own embedding model)")
+    parser.add_argument('--verbose', action='store_true',
+                        help="Write a ground-truth vs. prediction debug block per issue to the log file")
+    args = parser.parse_args()
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    
     # Ensure temp dir exists
     os.makedirs(TEMP_REPO_DIR, exist_ok=True)
-    evaluate()
\ No newline at end of file
+    evaluate(use_cache=not args.no_cache, use_batch=not args.no_batch,
+             prepare_workers=args.prepare_workers, resume=not args.no_resume)
\ No newline at end of file
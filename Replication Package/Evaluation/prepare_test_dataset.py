@@ -1,9 +1,32 @@
 import pandas as pd
 from datasets import load_dataset
 import re
+import json
 from collections import Counter
 import os
 
+# Patterns used for every diff line / hunk header, compiled once
+# Python: class ClassName or class ClassName(Base); def function_name
+PY_CLASS_RE = re.compile(r'class\s+([A-Z][a-zA-Z0-9_]*)')
+PY_DEF_RE = re.compile(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)')
+# Java: class ClassName, public class ClassName, interfaces, public void methodName(
+JAVA_CLASS_RE = re.compile(r'(?:public|private|protected)?\s*(?:static)?\s*(?:abstract)?\s*class\s+([A-Z][a-zA-Z0-9_]*)')
+JAVA_INTERFACE_RE = re.compile(r'(?:public|private|protected)?\s*interface\s+([A-Z][a-zA-Z0-9_]*)')
+JAVA_METHOD_RE = re.compile(r'(?:public|private|protected)?\s*(?:static)?\s*(?:final)?\s*(?:\w+(?:<[^>]+>)?)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(')
+# Hunk header: @@ -1,5 +1,5 @@ ...
+HUNK_HEADER_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@\s*(.*)')
+# diff --git a/path/to/file.py b/path/to/file.py
+DIFF_GIT_FILE_RE = re.compile(r'b/(.+)$')
+# https://github.com/owner/repo[/...]
+GITHUB_REPO_RE = re.compile(r'github\.com/([^/]+)/([^/]+)')
+
+# Dataset columns read when counting issues per repository (the diff and issue
+# text columns are only decoded for the selected repositories)
+REPO_COUNT_COLUMNS = [
+    'repo_owner', 'repo_name', 'html_url', 'issue_url',
+    'repo_files_without_tests_count', 'repo_lines_count', 'repo_stars', 'repo_language'
+]
+
 def detect_language(file_path):
     """Detect programming language from file extension"""
     if file_path.endswith('.py'):
@@ -19,32 +42,32 @@ def extract_entities(context, language, classes_set, functions_set):
     
     if language == 'python':
         # Extract class names: class ClassName or class ClassName(Base)
-        class_match = re.search(r'class\s+([A-Z][a-zA-Z0-9_]*)', context)
+        class_match = PY_CLASS_RE.search(context)
         if class_match:
             classes_set.add(class_match.group(1))
             return  # If we found a class, don't look for functions in the same line
         
         # Extract function/method names: def function_name
-        func_match = re.search(r'def\s+([a-zA-Z_][a-zA-Z0-9_]*)', context)
+        func_match = PY_DEF_RE.search(context)
         if func_match:
             functions_set.add(func_match.group(1))
     
     elif language == 'java':
         # Extract class names: class ClassName, public class ClassName, etc.
-        class_match = re.search(r'(?:public|private|protected)?\s*(?:static)?\s*(?:abstract)?\s*class\s+([A-Z][a-zA-Z0-9_]*)', context)
+        class_match = JAVA_CLASS_RE.search(context)
         if class_match:
             classes_set.add(class_match.group(1))
             return  # If we found a class, don't look for methods
         
         # Extract interface names
-        interface_match = re.search(r'(?:public|private|protected)?\s*interface\s+([A-Z][a-zA-Z0-9_]*)', context)
+        interface_match = JAVA_INTERFACE_RE.search(context)
         if interface_match:
             classes_set.add(interface_match.group(1))
             return
         
         # Extract method names: public void methodName( or private String methodName(
         # More comprehensive regex for Java methods
-        method_match = re.search(r'(?:public|private|protected)?\s*(?:static)?\s*(?:final)?\s*(?:\w+(?:<[^>]+>)?)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(', context)
+        method_match = JAVA_METHOD_RE.search(context)
         if method_match:
             method_name = method_match.group(1)
             # Exclude Java keywords that might be matched
@@ -65,47 +88,43 @@ def parse_diff(diff_text):
     current_file = None
     current_language = None
     
-    # Regex for hunk header: @@ -1,5 +1,5 @@ ...
-    hunk_header_re = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@\s*(.*)')
-    
     current_line_num = 0
     
     for line in lines:
-        # Extract file path from diff header
-        if line.startswith('diff --git'):
+        # Dispatch on the first character; '+++'/'---' only need a second look
+        c = line[:1]
+        if c == '+':
+            if line[:3] != '+++':
+                # Track changed line numbers
+                changed_lines.append(current_line_num)
+                current_line_num += 1
+            elif line.startswith('+++ b/'):
+                # Also handle +++ b/file format
+                file_path = line[6:].strip()
+                if file_path:
+                    changed_files.add(file_path)
+                    current_file = file_path
+                    current_language = detect_language(current_file)
+        elif c == ' ':
+            # Context line: present in the new file
+            current_line_num += 1
+        elif c == '@':
+            # Extract from hunk headers
+            hunk_match = HUNK_HEADER_RE.match(line)
+            if hunk_match:
+                current_line_num = int(hunk_match.group(1))
+                context = hunk_match.group(2)
+                # Extract class and function names from context
+                extract_entities(context, current_language, changed_classes, changed_functions)
+        elif c == 'd' and line.startswith('diff --git'):
+            # Extract file path from diff header
             # Format: diff --git a/path/to/file.py b/path/to/file.py
-            match = re.search(r'b/(.+)$', line)
+            match = DIFF_GIT_FILE_RE.search(line)
             if match:
                 current_file = match.group(1)
                 changed_files.add(current_file)
                 current_language = detect_language(current_file)
-            continue
-        
-        # Also handle +++ b/file format
-        if line.startswith('+++') and line.startswith('+++ b/'):
-            file_path = line[6:].strip()
-            if file_path:
-                changed_files.add(file_path)
-                current_file = file_path
-                current_language = detect_language(current_file)
-            continue
-        
-        # Extract from hunk headers
-        hunk_match = hunk_header_re.match(line)
-        if hunk_match:
-            current_line_num = int(hunk_match.group(1))
-            context = hunk_match.group(2)
-            # Extract class and function names from context
-            extract_entities(context, current_language, changed_classes, changed_functions)
-            continue
-
-        # Track changed line numbers
-        if line.startswith('+') and not line.startswith('+++'):
-            changed_lines.append(current_line_num)
-            current_line_num += 1
-        elif line.startswith(' ') or (line.startswith('-') and not line.startswith('---')):
-            if not line.startswith('-'):
-                current_line_num += 1
+        # Removed lines ('-') do not advance the new file's line numbers
                 
     return list(changed_files), list(changed_classes), list(changed_functions), changed_lines
 
@@ -115,22 +134,103 @@ def get_repo_info(url):
         return None, None
     # Example: https://github.com/owner/repo/issues/123
     # or https://github.com/owner/repo
-    match = re.search(r'github\.com/([^/]+)/([^/]+)', url)
+    match = GITHUB_REPO_RE.search(url)
     if match:
         return match.group(1), match.group(2)
     return None, None
 
 import requests
 import time
+from requests.adapters import HTTPAdapter
+
+# One pooled session for all GitHub API calls, so TCP/TLS connections are reused
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Pause before the remaining API quota drops below this many requests
+RATE_LIMIT_RESERVE = 5
+
+# Repositories above this size (KB) are not counted through the recursive Tree API
+LARGE_REPO_KB = 50_000
+
+# Conditional-request cache of GitHub API responses, reused across runs
+ETAG_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.github_cache.json')
 
 def get_github_token():
     """Retrieves the GitHub token from the environment variable."""
     return os.environ.get("GITHUB_TOKEN")
 
+def wait_for_rate_limit(response):
+    """Sleeps until the rate limit window resets when the remaining quota is nearly used up."""
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    reset = response.headers.get('X-RateLimit-Reset')
+    if remaining is None or reset is None or int(remaining) >= RATE_LIMIT_RESERVE:
+        return
+    delay = max(0, int(reset) - time.time()) + 1
+    print(f"    Rate limit almost exhausted ({remaining} left), waiting {delay:.0f}s for reset")
+    time.sleep(delay)
+
+def load_etag_cache():
+    """Loads the ETag cache of earlier GitHub API responses, or an empty one."""
+    try:
+        with open(ETAG_CACHE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get_etag_cache():
+    """Returns the ETag cache, loading it from disk on first use."""
+    global etag_cache
+    if etag_cache is None:
+        etag_cache = load_etag_cache()
+    return etag_cache
+
+def save_etag_cache():
+    """Writes the ETag cache back to disk if it was used."""
+    if not etag_cache:
+        return
+    try:
+        with open(ETAG_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(etag_cache, f)
+    except OSError as e:
+        print(f"Could not write {ETAG_CACHE_FILE}: {e}")
+
+# url -> {'etag': ..., 'data': ...}; revalidated with If-None-Match, a 304 costs no body.
+# Loaded by get_etag_cache on the first API call, so runs without lookups never read it
+etag_cache = None
+
+def github_get(url, headers, extract):
+    """
+    Conditional GET of a GitHub API URL.
+    Only extract(json) is kept in the cache, not the full response body.
+    Returns (status_code, extracted data); a 304 is reported as 200 with the cached data.
+    """
+    cache = get_etag_cache()
+    entry = cache.get(url)
+    if entry:
+        headers = {**headers, 'If-None-Match': entry['etag']}
+    response = session.get(url, headers=headers)
+    wait_for_rate_limit(response)
+    if response.status_code == 304 and entry:
+        return 200, entry['data']
+    if response.status_code != 200:
+        return response.status_code, None
+    data = extract(response.json())
+    if response.headers.get('ETag'):
+        cache[url] = {'etag': response.headers['ETag'], 'data': data}
+    return 200, data
+
+def count_tree_blobs(tree_data):
+    """Counts items of type 'blob' (files) in a recursive tree; None if GitHub truncated it."""
+    if tree_data.get('truncated'):
+        return None
+    return sum(1 for item in tree_data.get('tree', []) if item.get('type') == 'blob')
+
 def get_repo_details(owner, name):
     """
     Fetches repository details (size, file count) from GitHub API.
-    Returns a dictionary with 'size' (in KB) and 'file_count'.
+    Returns a dictionary with 'size' (in KB) and 'file_count'
+    ('file_count' is None when the tree is too large to count).
     """
     token = get_github_token()
     headers = {"Authorization": f"token {token}"} if token else {}
@@ -138,85 +238,99 @@ def get_repo_details(owner, name):
     # Get repo metadata for size
     api_url = f"https://api.github.com/repos/{owner}/{name}"
     try:
-        response = requests.get(api_url, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            size_kb = data.get('size', 0)
-            default_branch = data.get('default_branch', 'main')
+        status, repo_data = github_get(api_url, headers, lambda data: {
+            'size': data.get('size', 0),
+            'default_branch': data.get('default_branch', 'main')
+        })
+        if status == 200:
+            size_kb = repo_data['size']
+            default_branch = repo_data['default_branch']
+            
+            if size_kb > LARGE_REPO_KB:
+                # The recursive tree would be a multi-MB response and likely truncated
+                print(f"    Skipping file count for large repository {owner}/{name} ({size_kb} KB)")
+                return {'size': size_kb, 'file_count': None}
             
             # Get file count using Tree API (recursive)
-            # Note: Tree API has limits, but for small repos it should be fine.
             tree_url = f"https://api.github.com/repos/{owner}/{name}/git/trees/{default_branch}?recursive=1"
-            tree_response = requests.get(tree_url, headers=headers)
-            file_count = 0
-            if tree_response.status_code == 200:
-                tree_data = tree_response.json()
-                # Count items of type 'blob' (files)
-                file_count = len([item for item in tree_data.get('tree', []) if item.get('type') == 'blob'])
-            else:
-                print(f"    Warning: Could not fetch tree for {owner}/{name}: {tree_response.status_code}")
+            tree_status, file_count = github_get(tree_url, headers, count_tree_blobs)
+            if tree_status != 200:
+                file_count = 0
+                print(f"    Warning: Could not fetch tree for {owner}/{name}: {tree_status}")
+            elif file_count is None:
+                print(f"    Warning: Tree of {owner}/{name} is truncated, file count unknown")
             
             return {'size': size_kb, 'file_count': file_count}
-        elif response.status_code == 403:
+        elif status == 403:
             print(f"    Rate limit exceeded or forbidden for {owner}/{name}")
             return None
         else:
-            print(f"    Could not fetch metadata for {owner}/{name}: {response.status_code}")
+            print(f"    Could not fetch metadata for {owner}/{name}: {status}")
             return None
     except Exception as e:
         print(f"    Error fetching details for {owner}/{name}: {e}")
         return None
 
+def get_item_repo(item):
+    """Returns the 'owner/name' repository of a dataset item, or None if it cannot be determined."""
+    # Get repo info from dataset fields
+    owner = item.get('repo_owner')
+    name = item.get('repo_name')
+    
+    if not owner or not name:
+        # Fallback: Try to get from URL
+        url = item.get('html_url') or item.get('issue_url')
+        if url:
+            owner, name = get_repo_info(url)
+        if not owner or not name:
+            return None
+    return f"{owner}/{name}"
+
 def process_language(lang_code, num_repos=3, min_issues=10):
     print(f"Processing language: {lang_code}...")
     splits = ['test', 'train', 'validation']
-    all_ds = []
+    # Arrow-backed splits are iterated lazily; items are never all held in memory
+    split_datasets = []
     for split in splits:
         try:
             print(f"Loading {split} split for {lang_code}...")
             ds = load_dataset("JetBrains-Research/lca-bug-localization", lang_code, split=split, trust_remote_code=True)
-            all_ds.extend(list(ds))
+            split_datasets.append(ds)
         except Exception as e:
             print(f"Could not load {split} split for {lang_code}: {e}")
             
-    if not all_ds:
+    total_items = sum(len(ds) for ds in split_datasets)
+    if not total_items:
         print(f"No data found for {lang_code}")
         return []
 
-    # Group by repository and collect repo metadata from dataset
-    repo_issues = {}
+    # Group by repository and collect repo metadata from dataset. Only issue
+    # counts are kept; issues of the selected repositories are read in a second pass
+    repo_issue_counts = Counter()
     repo_metadata = {}
     
-    print(f"Total examples in {lang_code}: {len(all_ds)}")
+    print(f"Total examples in {lang_code}: {total_items}")
     
-    for item in all_ds:
-        # Get repo info from dataset fields
-        owner = item.get('repo_owner')
-        name = item.get('repo_name')
-        
-        if not owner or not name:
-            # Fallback: Try to get from URL
-            url = item.get('html_url') or item.get('issue_url')
-            if url:
-                owner, name = get_repo_info(url)
-            if not owner or not name:
+    for ds in split_datasets:
+        count_columns = [column for column in REPO_COUNT_COLUMNS if column in ds.column_names]
+        for item in ds.select_columns(count_columns):
+            repo_full_name = get_item_repo(item)
+            if repo_full_name is None:
                 continue
             
-        repo_full_name = f"{owner}/{name}"
-        if repo_full_name not in repo_issues:
-            repo_issues[repo_full_name] = []
-            # Store repo metadata from dataset (no API calls needed!)
-            repo_metadata[repo_full_name] = {
-                'file_count': item.get('repo_files_without_tests_count', 0),
-                'lines_count': item.get('repo_lines_count', 0),
-                'stars': item.get('repo_stars', 0),
-                'language': item.get('repo_language', lang_code)
-            }
-        
-        repo_issues[repo_full_name].append(item)
+            if repo_full_name not in repo_metadata:
+                # Store repo metadata from dataset (no API calls needed!)
+                repo_metadata[repo_full_name] = {
+                    'file_count': item.get('repo_files_without_tests_count', 0),
+                    'lines_count': item.get('repo_lines_count', 0),
+                    'stars': item.get('repo_stars', 0),
+                    'language': item.get('repo_language', lang_code)
+                }
+            
+            repo_issue_counts[repo_full_name] += 1
     
     # Filter repos with enough issues
-    valid_repos_list = [k for k, v in repo_issues.items() if len(v) >= min_issues]
+    valid_repos_list = [k for k, v in repo_issue_counts.items() if v >= min_issues]
     print(f"Found {len(valid_repos_list)} repositories with >= {min_issues} issues.")
     
     # Sort by file count (ascending) - no API calls needed!
@@ -233,6 +347,21 @@ def process_language(lang_code, num_repos=3, min_issues=10):
     # Take top N smallest
     selected_repo_names = sorted_repos_by_size[:num_repos]
     
+    # Second pass: the first issues (up to 10) of each selected repository, in dataset order
+    issues_per_repo = 10
+    repo_issues = {repo_name: [] for repo_name in selected_repo_names}
+    missing = len(repo_issues) * issues_per_repo
+    for ds in split_datasets:
+        for item in ds:
+            issues = repo_issues.get(get_item_repo(item))
+            if issues is not None and len(issues) < issues_per_repo:
+                issues.append(item)
+                missing -= 1
+                if not missing:
+                    break
+        if not missing:
+            break
+    
     extracted_data = []
     
     for repo_name in selected_repo_names:
@@ -241,7 +370,7 @@ def process_language(lang_code, num_repos=3, min_issues=10):
         print(f"\n  Extracting from {repo_name} (Files: {meta['file_count']}, Lines: {meta['lines_count']})...")
         
         # Take up to 10 issues
-        selected_issues = issues[:10] 
+        selected_issues = issues[:issues_per_repo] 
         
         for issue in selected_issues:
             diff_text = issue.get('diff', '')
@@ -257,9 +386,10 @@ def process_language(lang_code, num_repos=3, min_issues=10):
                 'Issue Title': issue.get('issue_title'),
                 'Issue Description': issue.get('issue_body'),
                 'Issue URL': issue.get('html_url') or issue.get('issue_url'),
-                'Changed Files': str(changed_files),
-                'Changed Classes': str(changed_classes),
-                'Changed Functions': str(changed_funcs),
+                # JSON lists, so the evaluation parses them with json.loads
+                'Changed Files': json.dumps(changed_files),
+                'Changed Classes': json.dumps(changed_classes),
+                'Changed Functions': json.dumps(changed_funcs),
                 'Changed Lines': str(changed_lines)[:1000], # Truncate if too long
                 'Diff URL': issue.get('diff_url')
             }
@@ -320,7 +450,10 @@ def main():
             existing_issue_urls.add(row['Issue URL'])
             new_java_count += 1
     print(f"Added {new_java_count} new Java issues (skipped {len(java_data) - new_java_count} duplicates)")
-    
+
+    # Keep the GitHub responses for revalidation on the next run
+    save_etag_cache()
+
     if not all_data:
         print("No data to save!")
         return